@@ -2,3 +2,5 @@
 
 from . import analyzers
 from .llm_analyzer import LLMAnalyzer
+from .llm_cache import LLMCache
+from .rate_limiter import RateLimiter
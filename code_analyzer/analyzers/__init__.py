@@ -1,3 +1,3 @@
 # code_analyzer.analyzers package
 
-from .python_analyzer import PythonAnalyzer, Issue, IssueSeverity
+from .python_analyzer import PythonAnalyzer, Issue, IssueSeverity, analyze_many
@@ -3,13 +3,16 @@ Python code analyzer module for analyzing Python source code.
 """
 
 import ast
+import copy
+import hashlib
 import os
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, NamedTuple, Optional, Set, Tuple
 from enum import Enum
 import re
 
 
-class IssueSeverity(Enum):
+class IssueSeverity(str, Enum):
     """Enum representing the severity of code issues."""
     HIGH = "HIGH"
     MEDIUM = "MEDIUM"
@@ -19,6 +22,8 @@ class IssueSeverity(Enum):
 class Issue:
     """Class representing a code issue."""
     
+    __slots__ = ("file", "line", "message", "severity", "category", "recommendation")
+    
     def __init__(self, file: str, line: int, message: str, 
                  severity: IssueSeverity, category: str, recommendation: str = ""):
         self.file = file
@@ -29,6 +34,91 @@ class Issue:
         self.recommendation = recommendation
 
 
+class _IssueRecord(NamedTuple):
+    """Canonical form of a detected issue, shared by the issue-reporting APIs."""
+    kind: str
+    line: int
+    message: str
+    severity: IssueSeverity
+    category: str
+    recommendation: str
+
+
+class _CollectVisitor(ast.NodeVisitor):
+    """
+    Single-pass visitor that collects the nodes and counts used by the analyzer.
+    """
+    
+    def __init__(self):
+        self.functions: List[ast.FunctionDef] = []
+        self.classes: List[ast.ClassDef] = []
+        self.except_handlers: List[ast.ExceptHandler] = []
+        self.imports: Set[Tuple[str, str]] = set()
+        # Per-function control-flow counts keyed by id() of the FunctionDef node
+        self.function_stats: Dict[int, Dict[str, int]] = {}
+        self._open_functions: List[Dict[str, int]] = []
+        self.if_statements = 0
+        self.for_loops = 0
+        self.while_loops = 0
+        self.try_except = 0
+        self.boolean_ops = 0
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions.append(node)
+        stats = {"ifs": 0, "fors": 0, "whiles": 0, "trys": 0}
+        self._open_functions.append(stats)
+        self.generic_visit(node)
+        self._open_functions.pop()
+        stats["complexity"] = stats["ifs"] + stats["fors"] + stats["whiles"] + stats["trys"]
+        self.function_stats[id(node)] = stats
+    
+    def _count_in_functions(self, key: str) -> None:
+        """Add a control-flow node to every enclosing function's counts."""
+        for stats in self._open_functions:
+            stats[key] += 1
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes.append(node)
+        self.generic_visit(node)
+    
+    def visit_Import(self, node: ast.Import) -> None:
+        for name in node.names:
+            self.imports.add(("", name.name))
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        module = node.module or ''
+        for name in node.names:
+            self.imports.add((module, name.name))
+    
+    def visit_If(self, node: ast.If) -> None:
+        self.if_statements += 1
+        self._count_in_functions("ifs")
+        self.generic_visit(node)
+    
+    def visit_For(self, node: ast.For) -> None:
+        self.for_loops += 1
+        self._count_in_functions("fors")
+        self.generic_visit(node)
+    
+    def visit_While(self, node: ast.While) -> None:
+        self.while_loops += 1
+        self._count_in_functions("whiles")
+        self.generic_visit(node)
+    
+    def visit_Try(self, node: ast.Try) -> None:
+        self.try_except += 1
+        self._count_in_functions("trys")
+        self.generic_visit(node)
+    
+    def visit_BoolOp(self, node: ast.BoolOp) -> None:
+        self.boolean_ops += 1
+        self.generic_visit(node)
+    
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        self.except_handlers.append(node)
+        self.generic_visit(node)
+
+
 class PythonAnalyzer:
     """
     Analyzer for Python source code that extracts metrics and structure information.
@@ -38,11 +128,18 @@ class PythonAnalyzer:
         self.content = content
         self.file_path = file_path
         self.tree = None
+        self._line_counts = None
+        self._collected = _CollectVisitor()
         try:
-            self.tree = ast.parse(content)
-        except SyntaxError as e:
+            # Compile straight to an AST (no type comments, no feature_version
+            # handling); docstrings are kept since coverage metrics need them
+            self.tree = compile(content, file_path, 'exec', ast.PyCF_ONLY_AST, dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
             # Handle syntax errors gracefully
             pass
+        else:
+            # Walk the tree once; the metric helpers read from the collected data
+            self._collected.visit(self.tree)
         
     def analyze(self) -> Dict[str, Any]:
         """
@@ -64,7 +161,9 @@ class PythonAnalyzer:
         # Calculate additional metrics
         cognitive_complexity = self._calculate_cognitive_complexity()
         docstring_coverage = self._calculate_docstring_coverage()
-        maintainability = self._calculate_maintainability()
+        maintainability = self._calculate_maintainability(
+            lines, complexity, functions, classes, docstring_coverage
+        )
         
         # Build the metrics dictionary
         metrics = {
@@ -84,7 +183,8 @@ class PythonAnalyzer:
                 "functions": functions,
                 "classes": classes,
                 "imports": len(imports),
-                "import_names": imports
+                "import_names": sorted(f"{module}.{name}" if module else name
+                                       for module, name in imports)
             },
             "complexity": {
                 "cyclomatic": complexity["total_complexity"],
@@ -108,67 +208,72 @@ class PythonAnalyzer:
         """Count the number of function definitions in the AST."""
         if not self.tree:
             return 0
-        return len([node for node in ast.walk(self.tree) if isinstance(node, ast.FunctionDef)])
+        return len(self._collected.functions)
     
     def _count_classes(self) -> int:
         """Count the number of class definitions in the AST."""
         if not self.tree:
             return 0
-        return len([node for node in ast.walk(self.tree) if isinstance(node, ast.ClassDef)])
+        return len(self._collected.classes)
     
     def _count_lines(self) -> Dict[str, int]:
-        """Count different types of lines in the code."""
+        """Count different types of lines in the code (computed once and cached)."""
+        if self._line_counts is not None:
+            return self._line_counts
+        
         if not self.content:
-            return {"total": 0, "code": 0, "comments": 0, "blank": 0}
+            self._line_counts = {"total": 0, "code": 0, "comments": 0, "blank": 0}
+            return self._line_counts
         
         lines = self.content.splitlines()
         total_lines = len(lines)
-        blank_lines = sum(1 for line in lines if not line.strip())
+        blank_lines = 0
+        comment_lines = 0
         
-        # Simple heuristic for comment lines
-        comment_lines = sum(1 for line in lines if line.strip().startswith('#'))
+        # Single pass; simple heuristic for comment lines
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                blank_lines += 1
+            elif stripped[0] == '#':
+                comment_lines += 1
         
         # Code lines are those that are neither blank nor comments
         code_lines = total_lines - blank_lines - comment_lines
         
-        return {
+        self._line_counts = {
             "total": total_lines,
             "code": code_lines,
             "comments": comment_lines,
             "blank": blank_lines
         }
+        return self._line_counts
     
-    def _extract_imports(self) -> List[str]:
-        """Extract all import statements from the AST."""
+    def _extract_imports(self) -> Set[Tuple[str, str]]:
+        """
+        Extract all import statements from the AST.
+
+        Imports are returned as unique ``(module, name)`` pairs; plain ``import x``
+        statements use an empty module. Dotted names are only built when the
+        metrics are serialized.
+        """
         if not self.tree:
-            return []
+            return set()
             
-        imports = []
-        
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.Import):
-                for name in node.names:
-                    imports.append(name.name)
-            elif isinstance(node, ast.ImportFrom):
-                module = node.module or ''
-                for name in node.names:
-                    imports.append(f"{module}.{name.name}")
-        
-        return imports
+        return self._collected.imports
     
     def _calculate_complexity(self) -> Dict[str, int]:
         """Calculate complexity metrics for the code."""
         if not self.tree:
             return {"if_statements": 0, "for_loops": 0, "while_loops": 0, "total_complexity": 0}
             
-        # Count control flow statements as a simple complexity metric
-        if_statements = len([node for node in ast.walk(self.tree) if isinstance(node, ast.If)])
-        for_loops = len([node for node in ast.walk(self.tree) if isinstance(node, ast.For)])
-        while_loops = len([node for node in ast.walk(self.tree) if isinstance(node, ast.While)])
-        
-        # Count additional complexity factors
-        try_except = len([node for node in ast.walk(self.tree) if isinstance(node, ast.Try)])
-        boolean_ops = len([node for node in ast.walk(self.tree) if isinstance(node, ast.BoolOp)])
+        # Count control flow statements and additional complexity factors
+        collected = self._collected
+        if_statements = collected.if_statements
+        for_loops = collected.for_loops
+        while_loops = collected.while_loops
+        try_except = collected.try_except
+        boolean_ops = collected.boolean_ops
         
         total_complexity = if_statements + for_loops + while_loops + try_except + boolean_ops
         
@@ -212,8 +317,8 @@ class PythonAnalyzer:
         if not self.tree:
             return 0.0
             
-        functions = [node for node in ast.walk(self.tree) if isinstance(node, ast.FunctionDef)]
-        classes = [node for node in ast.walk(self.tree) if isinstance(node, ast.ClassDef)]
+        functions = self._collected.functions
+        classes = self._collected.classes
         
         total_items = len(functions) + len(classes)
         if total_items == 0:
@@ -222,23 +327,42 @@ class PythonAnalyzer:
         items_with_docstring = 0
         
         for node in functions + classes:
-            if ast.get_docstring(node):
+            if self._has_docstring(node):
                 items_with_docstring += 1
                 
         return (items_with_docstring / total_items) * 100
     
-    def _calculate_maintainability(self) -> Dict[str, float]:
-        """Calculate maintainability metrics."""
+    @staticmethod
+    def _has_docstring(node: ast.AST) -> bool:
+        """Check whether a function or class body starts with a non-empty docstring."""
+        body = node.body
+        if not body or not isinstance(body[0], ast.Expr):
+            return False
+        value = body[0].value
+        return isinstance(value, ast.Constant) and isinstance(value.value, str) and bool(value.value.strip())
+    
+    def _calculate_maintainability(self, lines: Dict[str, int], complexity: Dict[str, int],
+                                   n_functions: int, n_classes: int,
+                                   docstring_coverage: float) -> Dict[str, float]:
+        """
+        Calculate maintainability metrics.
+        
+        Args:
+            lines: Line counts from _count_lines
+            complexity: Complexity counts from _calculate_complexity
+            n_functions: Number of function definitions
+            n_classes: Number of class definitions
+            docstring_coverage: Docstring coverage percentage
+            
+        Returns:
+            Dictionary with the maintainability score and technical debt ratio
+        """
         if not self.tree:
             return {"score": 0.0, "debt_ratio": 100.0}
             
         # Calculate maintainability index (simplified version)
         # Higher is better, scale 0-100
-        lines = self._count_lines()
-        complexity = self._calculate_complexity()
-        
-        # Simplified maintainability index formula
-        volume = lines["code"] * (complexity["total_complexity"] / max(1, self._count_functions() + self._count_classes()))
+        volume = lines["code"] * (complexity["total_complexity"] / max(1, n_functions + n_classes))
         maintainability_index = max(0, min(100, 100 - volume / 10))
         
         # Calculate technical debt ratio (higher is worse)
@@ -256,20 +380,18 @@ class PythonAnalyzer:
                 debt_ratio += 20.0
             
             # Low docstring coverage increases debt
-            docstring_coverage = self._calculate_docstring_coverage()
             if docstring_coverage < 50:
                 debt_ratio += 20.0
             
             # Long functions increase debt
             long_functions = 0
-            for node in ast.walk(self.tree):
-                if isinstance(node, ast.FunctionDef):
-                    if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
-                        if node.end_lineno - node.lineno > 30:
-                            long_functions += 1
+            for node in self._collected.functions:
+                if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
+                    if node.end_lineno - node.lineno > 30:
+                        long_functions += 1
             
             if long_functions > 0:
-                debt_ratio += 20.0 * (long_functions / max(1, self._count_functions()))
+                debt_ratio += 20.0 * (long_functions / max(1, n_functions))
         
         # Cap debt ratio at 100%
         debt_ratio = min(100.0, debt_ratio)
@@ -281,8 +403,6 @@ class PythonAnalyzer:
         
     def detect_issues(self) -> List[Issue]:
         """Detect potential issues in the code and return a list of Issue objects."""
-        issues = []
-        
         if not self.tree:
             return [Issue(
                 self.file_path, 
@@ -292,131 +412,113 @@ class PythonAnalyzer:
                 "Syntax",
                 "Fix the syntax errors in the file to enable proper analysis."
             )]
-            
-        # Check for long functions (more than 50 lines)
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.FunctionDef):
-                if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
-                    func_lines = node.end_lineno - node.lineno
-                    if func_lines > 50:
-                        issues.append(Issue(
-                            self.file_path,
-                            node.lineno,
-                            f"Function '{node.name}' is too long ({func_lines} lines)",
-                            IssueSeverity.MEDIUM,
-                            "Maintainability",
-                            "Consider breaking this function into smaller, more focused functions."
-                        ))
         
-        # Check for too many arguments in functions (more than 5)
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.FunctionDef):
-                arg_count = len(node.args.args)
-                if arg_count > 5:
-                    issues.append(Issue(
-                        self.file_path,
+        return [
+            Issue(self.file_path, record.line, record.message, record.severity,
+                  record.category, record.recommendation)
+            for record in self._iter_issues()
+        ]
+        
+    def _detect_issues(self) -> List[Dict[str, Any]]:
+        """Detect potential issues in the code."""
+        if not self.tree:
+            return []
+        
+        return [
+            {
+                "type": record.kind,
+                "message": record.message,
+                "line": record.line,
+                "severity": "warning"
+            }
+            for record in self._iter_issues()
+            if record.kind in ("long_function", "too_many_args")
+        ]
+    
+    def _iter_issues(self) -> Iterator[_IssueRecord]:
+        """Yield every issue found in the parsed tree as an _IssueRecord."""
+        functions = self._collected.functions
+        classes = self._collected.classes
+        
+        # Check for long functions (more than 50 lines)
+        for node in functions:
+            if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
+                func_lines = node.end_lineno - node.lineno
+                if func_lines > 50:
+                    yield _IssueRecord(
+                        "long_function",
                         node.lineno,
-                        f"Function '{node.name}' has too many arguments ({arg_count})",
+                        f"Function '{node.name}' is too long ({func_lines} lines)",
                         IssueSeverity.MEDIUM,
-                        "Design",
-                        "Consider grouping related parameters into a class or using keyword arguments."
-                    ))
+                        "Maintainability",
+                        "Consider breaking this function into smaller, more focused functions."
+                    )
+        
+        # Check for too many arguments in functions (more than 5)
+        for node in functions:
+            arg_count = len(node.args.args)
+            if arg_count > 5:
+                yield _IssueRecord(
+                    "too_many_args",
+                    node.lineno,
+                    f"Function '{node.name}' has too many arguments ({arg_count})",
+                    IssueSeverity.MEDIUM,
+                    "Design",
+                    "Consider grouping related parameters into a class or using keyword arguments."
+                )
         
         # Check for missing docstrings in functions and classes
-        for node in ast.walk(self.tree):
-            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
-                if not ast.get_docstring(node):
-                    node_type = "class" if isinstance(node, ast.ClassDef) else "function"
-                    issues.append(Issue(
-                        self.file_path,
+        for node_type, nodes in (("function", functions), ("class", classes)):
+            for node in nodes:
+                if not self._has_docstring(node):
+                    yield _IssueRecord(
+                        "missing_docstring",
                         node.lineno,
                         f"Missing docstring in {node_type} '{node.name}'",
                         IssueSeverity.LOW,
                         "Documentation",
                         f"Add a docstring to describe what this {node_type} does."
-                    ))
-        
-        # Check for overly complex functions
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.FunctionDef):
-                # Count complexity factors within this function
-                if_statements = len([n for n in ast.walk(node) if isinstance(n, ast.If)])
-                loops = len([n for n in ast.walk(node) if isinstance(n, (ast.For, ast.While))])
-                try_except = len([n for n in ast.walk(node) if isinstance(n, ast.Try)])
-                
-                complexity = if_statements + loops + try_except
-                if complexity > 10:
-                    issues.append(Issue(
-                        self.file_path,
-                        node.lineno,
-                        f"Function '{node.name}' is too complex (complexity: {complexity})",
-                        IssueSeverity.HIGH,
-                        "Complexity",
-                        "Refactor this function to reduce its complexity by extracting logic into helper functions."
-                    ))
-        
-        # Check for potential bugs
-        for node in ast.walk(self.tree):
-            # Check for empty except blocks
-            if isinstance(node, ast.ExceptHandler):
-                if not node.body or all(isinstance(n, ast.Pass) for n in node.body):
-                    issues.append(Issue(
-                        self.file_path,
+                    )
+        
+        # Check for overly complex functions, using the control-flow counts
+        # gathered for each function during the collection pass
+        function_stats = self._collected.function_stats
+        for node in functions:
+            complexity = function_stats[id(node)]["complexity"]
+            if complexity > 10:
+                yield _IssueRecord(
+                    "complex_function",
+                    node.lineno,
+                    f"Function '{node.name}' is too complex (complexity: {complexity})",
+                    IssueSeverity.HIGH,
+                    "Complexity",
+                    "Refactor this function to reduce its complexity by extracting logic into helper functions."
+                )
+        
+        # Check for empty except blocks
+        for node in self._collected.except_handlers:
+            if not node.body or all(isinstance(n, ast.Pass) for n in node.body):
+                yield _IssueRecord(
+                    "empty_except",
+                    node.lineno,
+                    "Empty except block",
+                    IssueSeverity.HIGH,
+                    "Error Handling",
+                    "Empty except blocks hide errors. Either handle the exception properly or log it."
+                )
+        
+        # Check for mutable default arguments
+        for node in functions:
+            for default in node.args.defaults:
+                if isinstance(default, (ast.List, ast.Dict, ast.Set)):
+                    yield _IssueRecord(
+                        "mutable_default",
                         node.lineno,
-                        "Empty except block",
-                        IssueSeverity.HIGH,
-                        "Error Handling",
-                        "Empty except blocks hide errors. Either handle the exception properly or log it."
-                    ))
-            
-            # Check for mutable default arguments
-            if isinstance(node, ast.FunctionDef):
-                for default in node.args.defaults:
-                    if isinstance(default, (ast.List, ast.Dict, ast.Set)):
-                        issues.append(Issue(
-                            self.file_path,
-                            node.lineno,
-                            f"Mutable default argument in function '{node.name}'",
-                            IssueSeverity.MEDIUM,
-                            "Bug Risk",
-                            "Using mutable objects as default arguments can lead to unexpected behavior. Use None instead."
-                        ))
-        
-        return issues
-        
-    def _detect_issues(self) -> List[Dict[str, Any]]:
-        """Detect potential issues in the code."""
-        issues = []
-        
-        if not self.tree:
-            return issues
-            
-        # Check for long functions (more than 50 lines)
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.FunctionDef):
-                if hasattr(node, 'end_lineno') and hasattr(node, 'lineno'):
-                    func_lines = node.end_lineno - node.lineno
-                    if func_lines > 50:
-                        issues.append({
-                            "type": "long_function",
-                            "message": f"Function '{node.name}' is too long ({func_lines} lines)",
-                            "line": node.lineno,
-                            "severity": "warning"
-                        })
-        
-        # Check for too many arguments in functions (more than 5)
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.FunctionDef):
-                arg_count = len(node.args.args)
-                if arg_count > 5:
-                    issues.append({
-                        "type": "too_many_args",
-                        "message": f"Function '{node.name}' has too many arguments ({arg_count})",
-                        "line": node.lineno,
-                        "severity": "warning"
-                    })
-        
-        return issues
+                        f"Mutable default argument in function '{node.name}'",
+                        IssueSeverity.MEDIUM,
+                        "Bug Risk",
+                        "Using mutable objects as default arguments can lead to unexpected behavior. Use None instead."
+                    )
         
     def _create_error_metrics(self, error_message: str) -> Dict[str, Any]:
         """Create a metrics dictionary for error cases."""
@@ -460,3 +562,58 @@ class PythonAnalyzer:
                 "severity": "error"
             }]
         }
+
+
+def _analyze_source(content: str, file_path: str) -> Dict[str, Any]:
+    """Analyze a single file's content (process pool entry point)."""
+    return PythonAnalyzer(content, file_path).analyze()
+
+
+def analyze_many(paths: List[str], workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Analyze several Python files in parallel using a process pool.
+    
+    Files are keyed on a hash of their content so identical files are only
+    analyzed once.
+    
+    Args:
+        paths: Paths of the Python files to analyze
+        workers: Number of worker processes (defaults to the number of CPUs)
+        
+    Returns:
+        Dictionary mapping each file path to its analysis metrics
+    """
+    paths_by_hash: Dict[str, List[str]] = {}
+    contents: Dict[str, str] = {}
+    
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if digest not in contents:
+            contents[digest] = content
+            paths_by_hash[digest] = []
+        paths_by_hash[digest].append(path)
+    
+    digests = list(contents)
+    first_paths = [paths_by_hash[d][0] for d in digests]
+    
+    if len(digests) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            metrics_list = list(executor.map(_analyze_source,
+                                             [contents[d] for d in digests],
+                                             first_paths))
+    else:
+        metrics_list = [_analyze_source(contents[d], p) for d, p in zip(digests, first_paths)]
+    
+    results = {}
+    for digest, metrics in zip(digests, metrics_list):
+        first_path, *duplicate_paths = paths_by_hash[digest]
+        results[first_path] = metrics
+        for path in duplicate_paths:
+            duplicate = copy.deepcopy(metrics)
+            duplicate["file_info"]["path"] = path
+            duplicate["file_info"]["name"] = os.path.basename(path)
+            results[path] = duplicate
+    
+    return results
@@ -2,18 +2,585 @@
 LLM-based code analyzer module for advanced code analysis across multiple programming languages.
 """
 
+import asyncio
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import heapq
+import importlib.util
+import io
+import itertools
 import os
-from openai import OpenAI
+from collections import Counter, OrderedDict
+from collections.abc import Hashable
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+from pygments.lexers import guess_lexer
+from pygments.util import ClassNotFound
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from typing import Dict, List, Any, Optional, Set, Union, Tuple
-import json
+import orjson
 import time
 import re
 import logging
+import tokenize
+
+from .llm_cache import LLMCache
+from .rate_limiter import RateLimiter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Patterns used when parsing free-text LLM responses and project metadata
+_NAME_RE = re.compile(r'`([^`]+)`|"([^"]+)"|\'([^\']+)\'')
+_FUNC_COUNT_RE = re.compile(r'(\d+)\s+functions?', re.IGNORECASE)
+_CLASS_COUNT_RE = re.compile(r'(\d+)\s+classes?', re.IGNORECASE)
+_SCORE_RE = re.compile(r'\b(\d{1,3})\b')
+_PY_IMPORT_RE = re.compile(r"^[ \t]*(?:import\s+([a-zA-Z0-9_.]+)|from\s+([a-zA-Z0-9_.]+)\s+import)", re.MULTILINE)
+_JS_IMPORT_RE = re.compile(r"""import[^;]*?from\s+['"]([^.][^'"]+)['"]|require\(['"]([^.][^'"]+)['"]\)""")
+_REQUIREMENT_SPEC_RE = re.compile(r'[=<>~]')
+
+# Entry point and config file names, in priority order, for key file detection
+_KEY_FILE_RANKS = {name: rank for rank, name in enumerate([
+    "main.py", "app.py", "index.js", "server.js", "application.java",
+    "Program.cs", "Main.java", "App.js", "App.tsx", "index.html",
+    "requirements.txt", "package.json", "setup.py", "pom.xml",
+    "build.gradle", ".env", "config.json", "settings.py", "webpack.config.js"
+])}
+_KEY_FILE_HINT_RE = re.compile(r'main|app|index|server|application|config')
+
+# Python modules too common to be worth reporting as project dependencies
+_PY_SKIPPED_MODULES = frozenset({"__future__", "typing", "os", "sys", "re", "json", "time", "datetime"})
+
+# Bullet points ("- ", "* ", ". ") or numbered items ("1. ") on their own line
+_LIST_ITEM_RE = re.compile(r'^[^\S\n]*(?:[-*.] |\d+\. )[^\S\n]*(.*\S)', re.MULTILINE)
+
+# Prompt compaction: runs of blank lines and trailing whitespace
+_BLANK_RUN_RE = re.compile(r'\n(?:[ \t]*\n){2,}')
+_TRAILING_WS_RE = re.compile(r'[ \t]+$', re.MULTILINE)
+
+# JSON structure requested for each analyzed file
+_ANALYSIS_SCHEMA = """{
+    "code_quality": {
+        "score": <0-100 score>,
+        "strengths": [<list of code strengths>],
+        "weaknesses": [<list of code weaknesses>]
+    },
+    "variables": {
+        "important_variables": [
+            {
+                "name": "<variable name>",
+                "type": "<variable type if detectable>",
+                "purpose": "<brief description of the variable's purpose>",
+                "transformations": [<list of transformations applied to this variable>]
+            }
+        ]
+    },
+    "functions": {
+        "count": <number of functions/methods>,
+        "important_functions": [
+            {
+                "name": "<function name>",
+                "purpose": "<brief description of what the function does>",
+                "parameters": [<list of parameters>],
+                "return_value": "<description of what the function returns>"
+            }
+        ]
+    },
+    "classes": {
+        "count": <number of classes>,
+        "important_classes": [
+            {
+                "name": "<class name>",
+                "purpose": "<brief description of the class's purpose>",
+                "properties": [<list of important properties>],
+                "methods": [<list of important methods>]
+            }
+        ]
+    },
+    "external_communications": {
+        "apis": [
+            {
+                "name": "<API name or endpoint>",
+                "purpose": "<what this API is used for>",
+                "method": "<HTTP method if applicable>"
+            }
+        ],
+        "databases": [
+            {
+                "type": "<database type>",
+                "operations": [<list of operations performed>]
+            }
+        ],
+        "file_operations": [<list of file operations performed>]
+    },
+    "data_transformations": [
+        {
+            "description": "<description of data transformation>",
+            "input": "<input data format or source>",
+            "output": "<output data format or destination>"
+        }
+    ],
+    "architecture": {
+        "patterns": [<identified design patterns>],
+        "anti_patterns": [<identified anti-patterns>],
+        "suggestions": [<architectural improvement suggestions>]
+    },
+    "security": {
+        "vulnerabilities": [<potential security issues>],
+        "severity": <"low", "medium", or "high">,
+        "mitigations": [<security improvement suggestions>]
+    },
+    "summary": "<overall assessment in 2-3 sentences>"
+}"""
+
+# Static instructions for file analysis. Sending them as the system message keeps the request
+# prefix identical across files, so it can be served from the provider's prompt cache.
+_ANALYSIS_SYSTEM_PROMPT = (
+    "You are an expert code analyzer with deep knowledge of all programming languages, particularly legacy systems. "
+    "Analyze the given code and provide detailed insights about its structure, purpose, variables, transformations, "
+    "external API communications, quality, and technical debt. Focus on helping users understand complex or legacy codebases.\n\n"
+    "Respond with a JSON object with this structure:\n"
+    + " ".join(line.strip() for line in _ANALYSIS_SCHEMA.splitlines()) + "\n\n"
+    "Focus on providing actionable insights and specific information about variables, transformations, and external "
+    "communications. If a section is not applicable, include an empty list or appropriate default values."
+)
+
+# JSON structure requested for project structure analysis
+_PROJECT_SCHEMA = """{
+    "project_type": "<type of project (e.g., web application, API, library, etc.)>",
+    "main_languages": [<list of main programming languages used>],
+    "architecture": "<architectural pattern identified (e.g., MVC, microservices, etc.)>",
+    "entry_points": [<likely entry points or main files>],
+    "dependencies": [
+        {
+            "name": "<dependency name>",
+            "purpose": "<what this dependency is used for>",
+            "type": "<framework, library, tool, etc.>"
+        }
+    ],
+    "code_lineage": {
+        "purpose": "<overall purpose of the codebase>",
+        "history": "<likely evolution of the codebase>",
+        "organization": "<how the code is organized>",
+        "complexity": "<assessment of codebase complexity>"
+    },
+    "technical_stack": {
+        "frontend": [<frontend technologies>],
+        "backend": [<backend technologies>],
+        "database": [<database technologies>],
+        "infrastructure": [<infrastructure technologies>]
+    },
+    "data_flow": {
+        "sources": [<data sources>],
+        "transformations": [<key data transformations>],
+        "sinks": [<data destinations>]
+    },
+    "key_components": [
+        {
+            "name": "<component name>",
+            "purpose": "<component purpose>",
+            "files": [<files that make up this component>]
+        }
+    ],
+    "legacy_aspects": [<list of legacy code patterns or technologies>],
+    "modernization_opportunities": [<suggestions for modernizing the codebase>],
+    "summary": "<overall assessment of the project structure>"
+}"""
+
+# Static instructions for project structure analysis, kept out of the user message like _ANALYSIS_SYSTEM_PROMPT
+_PROJECT_SYSTEM_PROMPT = (
+    "You are an expert software architect with deep knowledge of project structures across all programming languages "
+    "and frameworks. You specialize in analyzing legacy codebases and providing insights about their structure, purpose, "
+    "and technical stack.\n\n"
+    "Respond with a JSON object with this structure:\n"
+    + " ".join(line.strip() for line in _PROJECT_SCHEMA.splitlines()) + "\n\n"
+    "Focus on providing accurate insights about the project's structure, purpose, technical stack, and lineage. "
+    "If you're uncertain about any aspect, provide your best assessment based on the available information."
+)
+
+# Completion budget for a file analysis: a fixed allowance plus roughly one token per input token
+_BASE_ANALYSIS_TOKENS = 1500
+
+# Oversized files are analyzed in chunks of max_prompt_chars that repeat this much of the previous chunk
+_CHUNK_OVERLAP_CHARS = 800
+_SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2}
+_CHUNK_SUMMARY_TOKENS = 300
+
+
+def _chunk_content(content: str, size: int, overlap: int) -> List[str]:
+    """Split content into overlapping chunks of at most size characters, breaking at line ends where possible."""
+    chunks = []
+    start = 0
+    while start + size < len(content):
+        end = start + size
+        newline = content.rfind("\n", start + overlap + 1, end)
+        if newline != -1:
+            end = newline + 1
+        chunks.append(content[start:end])
+        newline = content.find("\n", end - overlap, end - 1)
+        start = newline + 1 if newline != -1 else end - overlap
+    chunks.append(content[start:])
+    return chunks
+
+
+def _strip_python_comment_lines(content: str) -> str:
+    """Drop full-line comments from Python source; lines inside string literals and shebangs are kept."""
+    comment_lines = set()
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(content).readline):
+            if (token.type == tokenize.COMMENT and not token.string.startswith("#!")
+                    and not token.line[:token.start[1]].strip()):
+                comment_lines.add(token.start[0])
+    except (tokenize.TokenError, SyntaxError):
+        # Source that does not tokenize is sent as it is
+        return content
+    if not comment_lines:
+        return content
+    return "".join(line for number, line in enumerate(io.StringIO(content), 1) if number not in comment_lines)
+
+
+def _merge_values(key: str, values: List[Any]) -> Any:
+    """Merge the values of one analysis field reported for several chunks of a file."""
+    first = values[0]
+    if isinstance(first, dict):
+        merged = {}
+        for value in values:
+            if isinstance(value, dict):
+                for field in value:
+                    merged.setdefault(field, None)
+        return {field: _merge_values(field, [value[field] for value in values
+                                             if isinstance(value, dict) and field in value])
+                for field in merged}
+    if isinstance(first, list):
+        # Overlapping chunks report the same items twice; named items are keyed by (name, purpose)
+        items: Dict[Any, Any] = {}
+        for value in values:
+            for item in value if isinstance(value, list) else ():
+                if isinstance(item, dict):
+                    item_key = ((item.get("name"), item.get("purpose")) if "name" in item
+                                else orjson.dumps(item, option=orjson.OPT_SORT_KEYS))
+                else:
+                    item_key = item
+                try:
+                    items.setdefault(item_key, item)
+                except TypeError:
+                    items.setdefault(orjson.dumps(item_key), item)
+        return list(items.values())
+    if key == "severity":
+        return max(values, key=lambda value: _SEVERITY_RANK.get(str(value).lower(), -1))
+    numbers = [value for value in values if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    if numbers:
+        # Quality is a per-file rating; everything else numeric is a count
+        return round(sum(numbers) / len(numbers)) if key == "score" else sum(numbers)
+    return next((value for value in values if value), first)
+
+# Number of parsed free-text responses kept per analyzer
+_TEXT_ANALYSIS_CACHE_SIZE = 512
+
+# Sections read from a free-text LLM response, by the name that starts each one
+_TEXT_SECTIONS = ("strength", "weakness", "variable", "function", "class", "api", "transformation", "security", "summary")
+
+# Keywords that classify a data transformation, grouped by type in priority order
+_TRANSFORM_TYPES = ("filter", "map", "reduce", "sort", "join", "group")
+_TRANSFORM_KEYWORD_RANKS = {
+    "filter": 0, "where": 0,
+    "map": 1, "convert": 1, "transform": 1,
+    "reduce": 2, "aggregate": 2, "sum": 2,
+    "sort": 3, "order": 3,
+    "join": 4, "merge": 4,
+    "group": 5,
+}
+# Lookahead so overlapping keywords are all found; no keyword is a prefix of another
+_TRANSFORM_KEYWORD_RE = re.compile("(?=(" + "|".join(_TRANSFORM_KEYWORD_RANKS) + "))")
+
+# Common section headers that end a section in a free-text LLM response
+_SECTION_HEADERS = ("code quality", "variables", "functions", "classes",
+                    "external communications", "data transformations",
+                    "architecture", "security", "summary", "conclusion",
+                    "recommendation", "strength", "weakness", "api")
+
+
+# Supported programming languages keyed by file extension (read-only)
+_EXT_TO_LANG = MappingProxyType({
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".java": "java",
+    ".c": "c",
+    ".cpp": "cpp",
+    ".h": "c/cpp header",
+    ".hpp": "c++ header",
+    ".cs": "csharp",
+    ".go": "go",
+    ".rb": "ruby",
+    ".php": "php",
+    ".swift": "swift",
+    ".kt": "kotlin",
+    ".r": "r",
+    ".scala": "scala",
+    ".pl": "perl",
+    ".sh": "bash",
+    ".ps1": "powershell",
+    ".sql": "sql",
+    ".html": "html",
+    ".css": "css",
+    ".jsx": "jsx",
+    ".tsx": "tsx",
+    ".vue": "vue",
+    ".rs": "rust",
+    ".m": "objective-c",
+    ".mm": "objective-c++",
+    ".groovy": "groovy",
+    ".dart": "dart",
+    ".lua": "lua",
+    ".clj": "clojure",
+    ".ex": "elixir",
+    ".exs": "elixir",
+    ".erl": "erlang",
+    ".hrl": "erlang",
+    ".hs": "haskell",
+    ".fs": "f#",
+    ".fsx": "f#",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".json": "json",
+    ".xml": "xml",
+    ".config": "config",
+    ".md": "markdown",
+    ".rst": "restructuredtext",
+    ".toml": "toml",
+    ".ini": "ini",
+    ".bat": "batch",
+    ".cmd": "batch",
+    ".dockerfile": "dockerfile",
+    ".tf": "terraform",
+    ".hcl": "hcl",
+})
+
+# Markers for the content heuristics; only the HTML ones are case-insensitive
+_CONTENT_HINT_RE = re.compile(r"<\?php|(?i:<html|<!doctype html)|import React|from 'react'|package |import |\{|#include|\.h")
+
+# Lowercased file names that identify a language without an extension match
+_SPECIAL_BASENAMES = MappingProxyType({
+    "dockerfile": "dockerfile",
+    "makefile": "makefile",
+    "gnumakefile": "makefile",
+    "makefile.am": "makefile",
+    "makefile.in": "makefile",
+    ".gitignore": "ignore",
+    ".dockerignore": "ignore",
+})
+
+# Interpreters recognised in a "#!" line, checked in order
+_SHEBANG_RE = re.compile(r'#![^\n]*')
+_SHEBANG_LANGUAGES = (
+    ("python", "python"),
+    ("node", "javascript"),
+    ("bash", "bash"),
+    ("sh", "bash"),
+    ("perl", "perl"),
+    ("ruby", "ruby")
+)
+
+# Languages we report; lexer guesses outside this set are too unreliable to use
+_KNOWN_LANGUAGES = frozenset(_EXT_TO_LANG.values())
+_GUESS_CHARS = 4096
+
+
+def _guess_language(content: str) -> Optional[str]:
+    """Guess a language from content with Pygments, or None if the guess is not a known language."""
+    try:
+        lexer = guess_lexer(content[:_GUESS_CHARS])
+    except ClassNotFound:
+        return None
+    return next((alias for alias in lexer.aliases if alias in _KNOWN_LANGUAGES), None)
+
+
+# Transient API errors worth retrying; anything else is reported to the caller
+_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+_backoff = wait_random_exponential(min=1, max=30)
+
+
+def _wait_retry_after(retry_state) -> float:
+    """Wait for the server's Retry-After hint when present, else back off exponentially."""
+    error = retry_state.outcome.exception()
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(float(retry_after), 60.0)
+    except (TypeError, ValueError):
+        return _backoff(retry_state)
+
+
+_retry_transient = retry(
+    retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(6),
+    reraise=True
+)
+
+# Characters that change JSON nesting or string state
+_JSON_STRUCTURE_RE = re.compile(r'[{}"\\]')
+
+
+class _JsonObjectEnd:
+    """Track nesting across streamed chunks to find where the top-level JSON object closes."""
+    
+    __slots__ = ("depth", "in_string", "escaped")
+    
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text: str) -> int:
+        """Return the offset just past the closing brace in text, or -1 if the object is still open."""
+        if not text:
+            # Role-only and empty deltas carry no characters, so a pending escape stays pending
+            return -1
+        pos = 0
+        if self.escaped:
+            # The escaped character is the first one of this chunk
+            self.escaped = False
+            pos = 1
+        while True:
+            match = _JSON_STRUCTURE_RE.search(text, pos)
+            if match is None:
+                return -1
+            char = match.group()
+            pos = match.end()
+            if self.in_string:
+                if char == "\\":
+                    if pos >= len(text):
+                        self.escaped = True
+                        return -1
+                    pos += 1
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    return pos
+
+
+# OpenAI clients shared by all analyzers using the same API key
+_CLIENT_CACHE: Dict[str, OpenAI] = {}
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+def _shared_client(api_key: str) -> OpenAI:
+    """Return a pooled OpenAI client for api_key, creating it on first use."""
+    client = _CLIENT_CACHE.get(api_key)
+    if client is None:
+        http_client = httpx.Client(
+            http2=_HTTP2,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=60.0
+        )
+        # Retries are handled by _retry_transient, so the client should not retry on its own
+        client = _CLIENT_CACHE.setdefault(api_key, OpenAI(api_key=api_key, http_client=http_client, max_retries=0))
+    return client
+
+
+# Every occurrence of a section header, overlapping ones included; no header is a prefix of another
+_SECTION_HEADER_RE = re.compile("(?=(" + "|".join(re.escape(header) for header in _SECTION_HEADERS) + "))")
+
+
+def _index_sections(lower_text: str) -> Tuple[List[int], List[str]]:
+    """Return the sorted offsets of all section headers in lower_text and the header found at each."""
+    positions, headers = [], []
+    for match in _SECTION_HEADER_RE.finditer(lower_text):
+        positions.append(match.start())
+        headers.append(match.group(1))
+    return positions, headers
+
+
+def _file_dependencies(file_path: str, content: str) -> List[str]:
+    """Extract the dependencies declared or imported by a single file, in order of appearance."""
+    dependencies: Dict[str, None] = {}
+    ext = os.path.splitext(file_path)[1].lower()
+    
+    # Python dependencies
+    if ext == ".py":
+        # Look for import statements
+        if "import" in content:
+            for match in _PY_IMPORT_RE.finditer(content):
+                module = (match.group(1) or match.group(2)).split(".")[0]
+                if module not in _PY_SKIPPED_MODULES:
+                    dependencies[module] = None
+    
+    # JavaScript/TypeScript dependencies
+    elif ext in [".js", ".jsx", ".ts", ".tsx"]:
+        # Look for import statements and require calls
+        if "import" in content or "require(" in content:
+            for match in _JS_IMPORT_RE.finditer(content):
+                dependencies[match.group(1) or match.group(2)] = None
+    
+    # Package.json
+    elif os.path.basename(file_path) == "package.json":
+        try:
+            package_data = orjson.loads(content)
+            if "dependencies" in package_data:
+                dependencies.update(dict.fromkeys(package_data["dependencies"]))
+            if "devDependencies" in package_data:
+                dependencies.update(dict.fromkeys(package_data["devDependencies"]))
+        except:
+            pass
+    
+    # Requirements.txt
+    elif os.path.basename(file_path) == "requirements.txt":
+        for line in content.splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                # Extract package name (remove version specifiers)
+                package = _REQUIREMENT_SPEC_RE.split(line, 1)[0].strip()
+                if package:
+                    dependencies[package] = None
+    
+    return list(dependencies)
+
+
+def _file_lineage_data(file_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """Select the lineage metadata fields of one file analysis."""
+    analysis = file_analysis["llm_analysis"]
+    return {
+        "file_path": file_analysis.get("file", "Unknown"),
+        "language": file_analysis.get("language", "unknown"),
+        "summary": analysis.get("summary", "No summary available"),
+        "functions": analysis.get("functions", {}).get("important_functions", []),
+        "classes": analysis.get("classes", {}).get("important_classes", []),
+        "data_transformations": analysis.get("data_transformations", []),
+        "external_communications": analysis.get("external_communications", {})
+    }
+
+
+# Number of file paths listed in the project structure prompt
+_PROJECT_FILE_LIST_LIMIT = 100
+
+# Maximum number of files read at once by LLMAnalyzer.prefetch
+_PREFETCH_CONCURRENCY = 256
+
+
+def _read_text(file_path: str) -> str:
+    """Read a source file as text, replacing undecodable bytes."""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+# Bump when prompts or post-processing change so cached analyses are not reused
+ANALYSIS_CACHE_VERSION = "v4"
+
 class LLMAnalyzer:
     """
     LLM-powered code analyzer that provides deep insights into code quality,
@@ -22,61 +589,7 @@ class LLMAnalyzer:
     """
     
     # Supported programming languages and their file extensions
-    SUPPORTED_LANGUAGES = {
-        ".py": "python",
-        ".js": "javascript",
-        ".ts": "typescript",
-        ".java": "java",
-        ".c": "c",
-        ".cpp": "cpp",
-        ".h": "c/cpp header",
-        ".hpp": "c++ header",
-        ".cs": "csharp",
-        ".go": "go",
-        ".rb": "ruby",
-        ".php": "php",
-        ".swift": "swift",
-        ".kt": "kotlin",
-        ".r": "r",
-        ".scala": "scala",
-        ".pl": "perl",
-        ".sh": "bash",
-        ".ps1": "powershell",
-        ".sql": "sql",
-        ".html": "html",
-        ".css": "css",
-        ".jsx": "jsx",
-        ".tsx": "tsx",
-        ".vue": "vue",
-        ".rs": "rust",
-        ".m": "objective-c",
-        ".mm": "objective-c++",
-        ".groovy": "groovy",
-        ".dart": "dart",
-        ".lua": "lua",
-        ".clj": "clojure",
-        ".ex": "elixir",
-        ".exs": "elixir",
-        ".erl": "erlang",
-        ".hrl": "erlang",
-        ".hs": "haskell",
-        ".fs": "f#",
-        ".fsx": "f#",
-        ".yaml": "yaml",
-        ".yml": "yaml",
-        ".json": "json",
-        ".xml": "xml",
-        ".config": "config",
-        ".md": "markdown",
-        ".rst": "restructuredtext",
-        ".toml": "toml",
-        ".ini": "ini",
-        ".bat": "batch",
-        ".cmd": "batch",
-        ".dockerfile": "dockerfile",
-        ".tf": "terraform",
-        ".hcl": "hcl",
-    }
+    SUPPORTED_LANGUAGES = _EXT_TO_LANG
     
     # Common frameworks and libraries for different languages
     COMMON_FRAMEWORKS = {
@@ -99,21 +612,217 @@ class LLMAnalyzer:
         ]
     }
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4-turbo"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4o-mini",
+                 max_tokens: int = 4000, max_prompt_chars: int = 24000, max_concurrency: int = 8,
+                 cache: Optional[LLMCache] = None, use_cache: bool = True, cache_ttl: Optional[float] = None,
+                 stream: bool = True, text_fallback: bool = False, use_llm_language_detect: bool = False,
+                 requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
         """
         Initialize the LLM analyzer.
         
         Args:
             api_key: OpenAI API key. If None, will try to use the OPENAI_API_KEY environment variable.
-            model: The OpenAI model to use for analysis. Default is gpt-4-turbo for best results.
+            model: The OpenAI model to use for analysis. Default is gpt-4o-mini, which is fast and
+                inexpensive for structured JSON extraction; pass a larger model for harder codebases.
+            max_tokens: Upper bound on the completion length of file and project analyses.
+            max_prompt_chars: Files longer than this are analyzed in overlapping chunks of at most
+                this many characters, whose results are merged.
+            max_concurrency: Maximum number of concurrent requests made by analyze_files.
+            cache: Response cache to use. If None and use_cache is True, a default on-disk cache is created.
+            use_cache: Set to False to always call the API.
+            cache_ttl: Seconds after which entries of the default cache expire, or None to keep them.
+            stream: Receive completions incrementally rather than as one blocking response.
+            text_fallback: Parse non-JSON responses as free text. Responses are requested in JSON mode,
+                so this is only useful for diagnosing malformed output.
+            use_llm_language_detect: Ask the LLM about files that neither the file name, content
+                heuristics nor a Pygments lexer guess could identify.
+            requests_per_minute: Account request limit to stay under, or None to not throttle requests.
+            tokens_per_minute: Account token limit to stay under, or None to not throttle tokens.
         """
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key) if self.api_key else None
+        self.client = _shared_client(self.api_key) if self.api_key else None
         self.model = model
+        self.max_tokens = max_tokens
+        self.max_prompt_chars = max_prompt_chars
+        self.max_concurrency = max_concurrency
+        self.cache = cache or (LLMCache(ttl=cache_ttl) if use_cache else None)
+        if self.cache:
+            self.cache.expire()
+        self.stream = stream
+        self.text_fallback = text_fallback
+        self.use_llm_language_detect = use_llm_language_detect
+        self.rate_limiter = (RateLimiter(requests_per_minute, tokens_per_minute)
+                             if requests_per_minute or tokens_per_minute else None)
+        
+        # LLM language detection results keyed by a hash of the leading content
+        self._lang_cache: Dict[str, str] = {}
+        
+        # Serialized text-fallback parses keyed by a hash of the response, least recently used first
+        self._text_analysis_cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+        
+        # The async client is bound to the event loop it was created on
+        self._aclient: Optional[AsyncOpenAI] = None
+        self._aclient_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Top-level async calls in progress; the client is closed when the last one finishes
+        self._aclient_users = 0
+        
+        # Languages detected for pending Batch API submissions, keyed by batch ID
+        self._batch_languages: Dict[str, Dict[str, str]] = {}
+        # Chunk requests of oversized files in pending batches: custom ID -> (file path, index, chunk count)
+        self._batch_chunks: Dict[str, Dict[str, Tuple[str, int, int]]] = {}
         
         if not self.client:
             logger.warning("No OpenAI API key provided. LLM analysis will not be available.")
     
+    def _async_client(self) -> AsyncOpenAI:
+        """Return an AsyncOpenAI client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            # Concurrent requests from aanalyze_files and chunked analyses share one connection pool
+            http_client = httpx.AsyncClient(
+                http2=_HTTP2,
+                limits=httpx.Limits(max_connections=256, max_keepalive_connections=256),
+                timeout=60.0
+            )
+            self._aclient = AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+            self._aclient_loop = loop
+        return self._aclient
+    
+    @asynccontextmanager
+    async def _async_client_scope(self):
+        """
+        Keep the async client open for the duration of a top-level call.
+        
+        The synchronous wrappers run each call on a fresh event loop, so a client left open
+        would leak its connection pool; it is closed once no top-level call is using it.
+        """
+        self._aclient_users += 1
+        try:
+            yield
+        finally:
+            self._aclient_users -= 1
+            if self._aclient_users == 0 and self._aclient is not None \
+                    and self._aclient_loop is asyncio.get_running_loop():
+                client, self._aclient, self._aclient_loop = self._aclient, None, None
+                await client.close()
+    
+    @_retry_transient
+    def _complete(self, request: Dict[str, Any]) -> str:
+        """
+        Run a chat completion, serving identical requests from the cache.
+        Rate-limit, connection and server errors are retried with backoff.
+        
+        Args:
+            request: Keyword arguments for chat.completions.create
+            
+        Returns:
+            The response message content
+        """
+        key = LLMCache.make_key(request) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        if self.rate_limiter:
+            self.rate_limiter.acquire(self._estimate_tokens(request))
+        
+        finish_reason = None
+        if self.stream:
+            chunks = []
+            # In JSON mode, stop reading as soon as the object is complete
+            object_end = _JsonObjectEnd() if "response_format" in request else None
+            stream = self.client.chat.completions.create(**request, stream=True)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                content = chunk.choices[0].delta.content or ""
+                end = object_end.feed(content) if object_end else -1
+                if end >= 0:
+                    chunks.append(content[:end])
+                    stream.close()
+                    break
+                chunks.append(content)
+            text = "".join(chunks)
+        else:
+            response = self.client.chat.completions.create(**request)
+            text = response.choices[0].message.content
+            finish_reason = response.choices[0].finish_reason
+        if key and self._cacheable(request, text, finish_reason):
+            self.cache.set(key, text)
+        return text
+    
+    @_retry_transient
+    async def _acomplete(self, request: Dict[str, Any]) -> str:
+        """
+        Async variant of _complete using the AsyncOpenAI client.
+        
+        Args:
+            request: Keyword arguments for chat.completions.create
+            
+        Returns:
+            The response message content
+        """
+        key = LLMCache.make_key(request) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        if self.rate_limiter:
+            await self.rate_limiter.aacquire(self._estimate_tokens(request))
+        
+        finish_reason = None
+        if self.stream:
+            chunks = []
+            object_end = _JsonObjectEnd() if "response_format" in request else None
+            stream = await self._async_client().chat.completions.create(**request, stream=True)
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                content = chunk.choices[0].delta.content or ""
+                end = object_end.feed(content) if object_end else -1
+                if end >= 0:
+                    chunks.append(content[:end])
+                    await stream.close()
+                    break
+                chunks.append(content)
+            text = "".join(chunks)
+        else:
+            response = await self._async_client().chat.completions.create(**request)
+            text = response.choices[0].message.content
+            finish_reason = response.choices[0].finish_reason
+        if key and self._cacheable(request, text, finish_reason):
+            self.cache.set(key, text)
+        return text
+    
+    @staticmethod
+    def _cacheable(request: Dict[str, Any], text: str, finish_reason: Optional[str]) -> bool:
+        """
+        Decide whether a response may be cached.
+        
+        Entries never expire by default, so JSON-mode replies that were cut off at max_tokens
+        or do not parse are left out; the request is sent again next time instead.
+        """
+        if "response_format" not in request:
+            return True
+        if finish_reason == "length":
+            return False
+        try:
+            orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return False
+        return True
+    
+    @staticmethod
+    def _estimate_tokens(request: Dict[str, Any]) -> int:
+        """Estimate the tokens a request counts against the rate limit: prompt plus max completion."""
+        # Roughly four characters per token
+        prompt_chars = sum(len(message["content"]) for message in request["messages"])
+        return prompt_chars // 4 + request.get("max_tokens", 0)
+    
     def detect_language(self, file_path: str, content: str) -> str:
         """
         Detect the programming language based on file extension or content.
@@ -126,144 +835,755 @@ class LLMAnalyzer:
         Returns:
             Detected programming language
         """
-        # First try to detect by file extension
-        ext = os.path.splitext(file_path)[1].lower()
-        if ext in self.SUPPORTED_LANGUAGES:
-            return self.SUPPORTED_LANGUAGES[ext]
+        language = self._detect_language_locally(file_path, content)
+        if language:
+            return language
+        
+        # Everything below only looks at the leading content; slice it once (re-slicing it is free)
+        head = content[:_GUESS_CHARS]
+        
+        # Files with the same leading content get the same answer
+        content_key = self._language_cache_key(head)
+        if content_key in self._lang_cache:
+            return self._lang_cache[content_key]
+        
+        # Try a local lexer guess before paying for an API call
+        detected_language = _guess_language(head)
+        
+        # If still not detected, optionally ask the LLM to identify the language
+        if not detected_language and self.use_llm_language_detect and self.client:
+            try:
+                detected_language = self._complete(self._language_detection_request(head)).strip().lower()
+            except Exception as e:
+                logger.warning(f"Error during language detection: {str(e)}")
+        
+        # Default to 'unknown' if detection fails
+        detected_language = detected_language or "unknown"
+        self._lang_cache[content_key] = detected_language
+        return detected_language
+    
+    async def adetect_language(self, file_path: str, content: str) -> str:
+        """
+        Async variant of detect_language; only the optional LLM fallback is awaited.
+        
+        Args:
+            file_path: Path to the file
+            content: File content
+            
+        Returns:
+            Detected programming language
+        """
+        language = self._detect_language_locally(file_path, content)
+        if language:
+            return language
+        
+        head = content[:_GUESS_CHARS]
+        content_key = self._language_cache_key(head)
+        if content_key in self._lang_cache:
+            return self._lang_cache[content_key]
+        
+        detected_language = _guess_language(head)
+        
+        if not detected_language and self.use_llm_language_detect and self.client:
+            try:
+                detected_language = await self._acomplete(self._language_detection_request(head))
+                detected_language = detected_language.strip().lower()
+            except Exception as e:
+                logger.warning(f"Error during language detection: {str(e)}")
+        
+        detected_language = detected_language or "unknown"
+        self._lang_cache[content_key] = detected_language
+        return detected_language
+    
+    def _detect_language_locally(self, file_path: str, content: str) -> Optional[str]:
+        """
+        Detect the language from the file name and content heuristics only.
+        
+        Args:
+            file_path: Path to the file
+            content: File content
+            
+        Returns:
+            Detected programming language, or None if the heuristics are inconclusive
+        """
+        # First try to detect by file extension (leading dots do not start one, as in os.path.splitext)
+        filename = os.path.basename(file_path)
+        dot = filename.rfind(".")
+        if dot > 0 and filename[:dot].lstrip("."):
+            language = _EXT_TO_LANG.get(filename[dot:].lower())
+            if language:
+                return language
         
         # Check for special filenames
-        filename = os.path.basename(file_path).lower()
-        if filename == "dockerfile":
-            return "dockerfile"
-        elif filename in ["makefile", "gnumakefile", "makefile.am", "makefile.in"]:
-            return "makefile"
-        elif filename.startswith("requirements") and filename.endswith(".txt"):
+        filename = filename.lower()
+        language = _SPECIAL_BASENAMES.get(filename)
+        if language:
+            return language
+        if filename.startswith("requirements") and filename.endswith(".txt"):
             return "requirements"
-        elif filename in [".gitignore", ".dockerignore"]:
-            return "ignore"
         
         # If extension is not recognized, use content-based heuristics
         if content:
             # Check for shebang
-            first_line = content.split('\n', 1)[0] if '\n' in content else content
-            if first_line.startswith("#!"):
-                if "python" in first_line:
-                    return "python"
-                elif "node" in first_line:
-                    return "javascript"
-                elif "bash" in first_line or "sh" in first_line:
-                    return "bash"
-                elif "perl" in first_line:
-                    return "perl"
-                elif "ruby" in first_line:
-                    return "ruby"
+            shebang = _SHEBANG_RE.match(content)
+            if shebang:
+                first_line = shebang.group()
+                for interpreter, language in _SHEBANG_LANGUAGES:
+                    if interpreter in first_line:
+                        return language
             
-            # Check for common language patterns
-            if "<?php" in content[:1000]:
+            # Check for common language patterns, collecting every marker in one scan of the head
+            hints = {hint.lower() for hint in _CONTENT_HINT_RE.findall(content, 0, 1000)}
+            if "<?php" in hints:
                 return "php"
-            elif "<html" in content[:1000].lower() or "<!doctype html" in content[:1000].lower():
+            elif "<html" in hints or "<!doctype html" in hints:
                 return "html"
-            elif "import React" in content[:1000] or "from 'react'" in content[:1000]:
+            elif "import react" in hints or "from 'react'" in hints:
                 return "jsx"
-            elif "package " in content[:1000] and "import " in content[:1000] and "{" in content[:1000]:
+            elif "package " in hints and ("import " in hints or "import react" in hints) and "{" in hints:
                 return "java"
-            elif "#include" in content[:1000] and (".h" in content[:1000] or ".hpp" in content[:1000]):
+            elif "#include" in hints and ".h" in hints:
                 return "cpp"
         
-        # If still not detected, ask the LLM to identify the language
-        if self.client:
+        return None
+    
+    @staticmethod
+    def _language_cache_key(content: str) -> str:
+        """Hash the part of the content that content-based language detection looks at."""
+        return hashlib.blake2b(content[:_GUESS_CHARS].encode("utf-8", "replace"), digest_size=16).hexdigest()
+    
+    def _language_detection_request(self, content: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for LLM-based language detection."""
+        return {
+            "model": "gpt-4o-mini",  # Use a smaller model for language detection
+            "messages": [
+                {"role": "system", "content": "You are a programming language detection expert. Identify the programming language of the given code snippet. Respond with only the language name in lowercase."},
+                {"role": "user", "content": f"Identify the programming language:\n\n```\n{content[:1000]}\n```"}
+            ],
+            "temperature": 0.1,
+            "max_tokens": 20
+        }
+    
+    def analyze_code(self, content: str, file_path: str, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyze code using an LLM to get advanced insights.
+        Enhanced to provide deeper analysis of legacy codebases.
+        
+        Args:
+            content: The source code content
+            file_path: Path to the file being analyzed
+            language: Programming language of the code (optional, will be detected if not provided)
+            
+        Returns:
+            Dictionary containing LLM analysis results
+        """
+        if not self.client:
+            return {
+                "error": "No API key provided. Set the OPENAI_API_KEY environment variable or pass an API key to the constructor."
+            }
+        
+        # Detect language if not provided
+        if not language or language == "unknown":
+            language = self.detect_language(file_path, content)
+        
+        # Unchanged files skip prompt building and post-processing entirely
+        result_key = self._analysis_cache_key(content, file_path, language)
+        cached = self._cached_analysis(result_key)
+        if cached is not None:
+            return cached
+            
+        try:
+            chunks = self._content_chunks(content, language)
+            if len(chunks) == 1:
+                analysis_text = self._complete(self._code_analysis_request(chunks[0], file_path, language))
+                result, parsed = self._build_code_analysis(analysis_text, content, language, file_path)
+                return self._store_analysis(result_key, result, parsed)
+            
+            # Map: analyze the chunks in parallel; reduce: merge the results and their summaries
+            requests = [self._chunk_analysis_request(chunk, file_path, language, index, len(chunks))
+                        for index, chunk in enumerate(chunks)]
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(requests))) as executor:
+                chunk_texts = list(executor.map(self._complete, requests))
+            analysis_data, parsed = self._merge_chunk_analyses(chunk_texts, file_path)
+            analysis_data["summary"] = self._complete(self._chunk_summary_request(analysis_data["summary"], file_path))
+            return self._store_analysis(result_key, self._build_chunked_analysis(analysis_data, chunk_texts, content, language, file_path), parsed)
+            
+        except Exception as e:
+            logger.error(f"Error during LLM analysis of {file_path}: {str(e)}")
+            return {
+                "error": f"Error during LLM analysis: {str(e)}",
+                "file": file_path
+            }
+    
+    async def aanalyze_code(self, content: str, file_path: str, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async variant of analyze_code using the AsyncOpenAI client.
+        
+        Args:
+            content: The source code content
+            file_path: Path to the file being analyzed
+            language: Programming language of the code (optional, will be detected if not provided)
+            
+        Returns:
+            Dictionary containing LLM analysis results
+        """
+        if not self.client:
+            return {
+                "error": "No API key provided. Set the OPENAI_API_KEY environment variable or pass an API key to the constructor."
+            }
+        
+        if not language or language == "unknown":
+            language = await self.adetect_language(file_path, content)
+        
+        result_key = self._analysis_cache_key(content, file_path, language)
+        cached = self._cached_analysis(result_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            chunks = self._content_chunks(content, language)
+            if len(chunks) == 1:
+                analysis_text = await self._acomplete(self._code_analysis_request(chunks[0], file_path, language))
+                result, parsed = self._build_code_analysis(analysis_text, content, language, file_path)
+                return self._store_analysis(result_key, result, parsed)
+            
+            chunk_texts = await asyncio.gather(*[
+                self._acomplete(self._chunk_analysis_request(chunk, file_path, language, index, len(chunks)))
+                for index, chunk in enumerate(chunks)
+            ])
+            analysis_data, parsed = self._merge_chunk_analyses(chunk_texts, file_path)
+            analysis_data["summary"] = await self._acomplete(self._chunk_summary_request(analysis_data["summary"], file_path))
+            return self._store_analysis(result_key, self._build_chunked_analysis(analysis_data, chunk_texts, content, language, file_path), parsed)
+        
+        except Exception as e:
+            logger.error(f"Error during LLM analysis of {file_path}: {str(e)}")
+            return {
+                "error": f"Error during LLM analysis: {str(e)}",
+                "file": file_path
+            }
+    
+    async def aanalyze_files(self, files: List[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """
+        Analyze several files concurrently, at most max_concurrency requests at a time.
+        Files with identical content are analyzed once and the result is shared between them.
+        
+        Args:
+            files: List of (file_path, content, language) tuples; language may be None
+            
+        Returns:
+            List of analysis results in the same order as the input
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def analyze_one(file_path: str, content: str, language: Optional[str]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aanalyze_code(content, file_path, language)
+        
+        # Group duplicates by language (or extension, when it is still to be detected) and content hash
+        groups: Dict[Tuple[str, bytes], List[int]] = {}
+        for index, (file_path, content, language) in enumerate(files):
+            kind = language if language and language != "unknown" else (
+                os.path.splitext(file_path)[1].lower() or os.path.basename(file_path).lower())
+            digest = hashlib.blake2b(content.encode("utf-8", "replace"), digest_size=16).digest()
+            groups.setdefault((kind, digest), []).append(index)
+        
+        representatives = [indices[0] for indices in groups.values()]
+        async with self._async_client_scope():
+            analyses = await asyncio.gather(*[analyze_one(*files[index]) for index in representatives])
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        for indices, result in zip(groups.values(), analyses):
+            results[indices[0]] = result
+            for index in indices[1:]:
+                results[index] = self._retarget_analysis(result, files[index][0])
+        return results
+    
+    @staticmethod
+    def _retarget_analysis(result: Dict[str, Any], file_path: str) -> Dict[str, Any]:
+        """Copy the analysis of a file for another file with the same content."""
+        result = dict(result, file=file_path)
+        if isinstance(result.get("llm_analysis"), dict):
+            file_name = os.path.basename(file_path)
+            result["llm_analysis"] = dict(
+                result["llm_analysis"],
+                file_path=file_path,
+                file_name=file_name,
+                file_extension=os.path.splitext(file_name)[1]
+            )
+        return result
+    
+    def analyze_files(self, files: List[Tuple[str, str, Optional[str]]]) -> List[Dict[str, Any]]:
+        """
+        Synchronous wrapper around aanalyze_files for callers without an event loop.
+        
+        Args:
+            files: List of (file_path, content, language) tuples; language may be None
+            
+        Returns:
+            List of analysis results in the same order as the input
+        """
+        return asyncio.run(self.aanalyze_files(files))
+    
+    def analyze_code_batch(self, files: List[Tuple[str, str, Optional[str]]],
+                           max_prompt_tokens: int = 6000, max_files_per_request: int = 10) -> List[Dict[str, Any]]:
+        """
+        Analyze many small files with as few requests as possible by packing several
+        files into each prompt.
+        
+        Args:
+            files: List of (file_path, content, language) tuples; language may be None
+            max_prompt_tokens: Estimated token budget for the code embedded in one request
+            max_files_per_request: Maximum number of files packed into one request
+            
+        Returns:
+            List of analysis results in the same order as the input
+        """
+        if not self.client:
+            return [self.analyze_code(content, file_path, language) for file_path, content, language in files]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+        group: List[Tuple[int, str, str, str]] = []
+        group_tokens = 0
+        
+        def flush() -> None:
+            if group:
+                for index, result in self._analyze_packed(group).items():
+                    results[index] = result
+                group.clear()
+        
+        for index, (file_path, content, language) in enumerate(files):
+            if not language or language == "unknown":
+                language = self.detect_language(file_path, content)
+            compacted = self._compact(content, language)
+            # Roughly four characters per token for source code
+            tokens = len(compacted) // 4 + 1
+            
+            if tokens > max_prompt_tokens:
+                # Too large to share a request with other files
+                results[index] = self.analyze_code(content, file_path, language)
+                continue
+            
+            if group and (group_tokens + tokens > max_prompt_tokens or len(group) >= max_files_per_request):
+                flush()
+                group_tokens = 0
+            group.append((index, file_path, content, language))
+            group_tokens += tokens
+        flush()
+        
+        # Any file the model skipped in a packed response is analyzed on its own
+        for index, (file_path, content, language) in enumerate(files):
+            if results[index] is None:
+                results[index] = self.analyze_code(content, file_path, language)
+        return results
+    
+    def _analyze_packed(self, group: List[Tuple[int, str, str, str]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Analyze a group of files in a single request.
+        
+        Args:
+            group: List of (index, file_path, content, language) tuples
+            
+        Returns:
+            Dictionary mapping input indices to analysis results for the files present in the response
+        """
+        file_sections = "\n".join(
+            f"File #{number}: '{file_path}' ({language}):\n```{language}\n{self._compact(content, language)}\n```\n"
+            for number, (_, file_path, content, language) in enumerate(group, 1)
+        )
+        prompt = f"""Analyze each of the following files:
+
+{file_sections}
+Instead of a single analysis, return a JSON object of the form {{"results": [...]}} with one entry per file, in the same order.
+Each entry must contain an "index" key with the file number and a "file" key with the file path exactly as given above,
+plus the analysis structure described in the system message."""
+        try:
+            max_tokens = _BASE_ANALYSIS_TOKENS * len(group) + len(prompt) // 4
+            analysis_text = self._complete(self._analysis_request(prompt, max_tokens))
+            entries = orjson.loads(analysis_text).get("results", [])
+        except Exception as e:
+            logger.error(f"Error during packed LLM analysis of {len(group)} files: {str(e)}")
+            return {}
+        
+        # Match entries by file number, falling back to the path if the model dropped the number
+        entries = [entry for entry in entries if isinstance(entry, dict)]
+        by_number = {entry.get("index"): entry for entry in entries}
+        by_path = {entry.get("file"): entry for entry in entries}
+        results = {}
+        for number, (index, file_path, content, language) in enumerate(group, 1):
+            analysis_data = by_number.get(number) or by_path.get(file_path)
+            if analysis_data is None:
+                continue
+            analysis_data.pop("index", None)
+            analysis_data.pop("file", None)
+            results[index] = {
+                "file": file_path,
+                "language": language,
+                "llm_analysis": self._enhance_analysis(analysis_data, content, language, file_path),
+                "raw_response": analysis_text
+            }
+        return results
+    
+    def submit_batch_analysis(self, file_contents: Dict[str, str]) -> Optional[str]:
+        """
+        Submit per-file analyses through the OpenAI Batch API.
+        
+        The Batch API has its own rate limits and lower per-token cost, which suits
+        offline whole-project scans that do not need results immediately. Oversized files
+        are submitted as one request per chunk, as in analyze_code.
+        
+        Args:
+            file_contents: Dictionary mapping file paths to their contents
+            
+        Returns:
+            The batch ID, or None if no client is available
+        """
+        if not self.client:
+            logger.warning("No OpenAI API key provided. Batch analysis is not available.")
+            return None
+        
+        languages = {}
+        chunk_ids = {}
+        lines = []
+        for file_path, content in file_contents.items():
+            language = self.detect_language(file_path, content)
+            languages[file_path] = language
+            chunks = self._content_chunks(content, language)
+            if len(chunks) == 1:
+                requests = [(file_path, self._code_analysis_request(chunks[0], file_path, language))]
+            else:
+                requests = []
+                for index, chunk in enumerate(chunks):
+                    custom_id = f"{file_path}#chunk{index}"
+                    chunk_ids[custom_id] = (file_path, index, len(chunks))
+                    requests.append((custom_id, self._chunk_analysis_request(chunk, file_path, language, index, len(chunks))))
+            for custom_id, body in requests:
+                lines.append(orjson.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": body
+                }))
+        
+        batch_input = self.client.files.create(
+            file=("batch_input.jsonl", b"\n".join(lines)),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_input.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        self._batch_languages[batch.id] = languages
+        self._batch_chunks[batch.id] = chunk_ids
+        return batch.id
+    
+    def wait_for_batch(self, batch_id: str, file_contents: Dict[str, str],
+                       poll_interval: float = 30.0, timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Poll a batch submitted with submit_batch_analysis and parse its results.
+        
+        Args:
+            batch_id: ID returned by submit_batch_analysis
+            file_contents: Dictionary mapping file paths to their contents
+            poll_interval: Seconds to wait between status checks
+            timeout: Maximum number of seconds to wait, or None to wait indefinitely
+            
+        Returns:
+            Dictionary mapping file paths to analysis results
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in ("completed", "failed", "expired", "cancelled"):
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} did not finish within {timeout} seconds")
+            time.sleep(poll_interval)
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} finished with status '{batch.status}'")
+        
+        languages = self._batch_languages.pop(batch_id, {})
+        chunk_ids = self._batch_chunks.pop(batch_id, {})
+        results = {}
+        chunk_texts: Dict[str, List[Optional[str]]] = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            file_path, index, total = chunk_ids.get(record["custom_id"], (record["custom_id"], 0, 1))
+            
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error")
+                results[file_path] = {
+                    "error": f"Error during LLM analysis: {error}",
+                    "file": file_path
+                }
+                continue
+            
+            analysis_text = response["body"]["choices"][0]["message"]["content"]
+            if total > 1:
+                chunk_texts.setdefault(file_path, [None] * total)[index] = analysis_text
+                continue
+            content = file_contents.get(file_path, "")
+            language = languages.get(file_path) or self.detect_language(file_path, content)
+            results[file_path], _ = self._build_code_analysis(analysis_text, content, language, file_path)
+        
+        # Merge the chunks of oversized files as analyze_code does; a failed chunk fails the file
+        for file_path, texts in chunk_texts.items():
+            if file_path in results:
+                continue
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",  # Use a smaller model for language detection
-                    messages=[
-                        {"role": "system", "content": "You are a programming language detection expert. Identify the programming language of the given code snippet. Respond with only the language name in lowercase."},
-                        {"role": "user", "content": f"Identify the programming language:\n\n```\n{content[:1000]}\n```"}
-                    ],
-                    temperature=0.1,
-                    max_tokens=20
-                )
-                detected_language = response.choices[0].message.content.strip().lower()
-                return detected_language
+                if None in texts:
+                    raise RuntimeError("some chunk results are missing from the batch output")
+                content = file_contents.get(file_path, "")
+                language = languages.get(file_path) or self.detect_language(file_path, content)
+                analysis_data, _ = self._merge_chunk_analyses(texts, file_path)
+                analysis_data["summary"] = self._complete(self._chunk_summary_request(analysis_data["summary"], file_path))
+                results[file_path] = self._build_chunked_analysis(analysis_data, texts, content, language, file_path)
             except Exception as e:
-                logger.warning(f"Error during language detection: {str(e)}")
+                logger.error(f"Error merging the batch analysis of {file_path}: {str(e)}")
+                results[file_path] = {
+                    "error": f"Error during LLM analysis: {str(e)}",
+                    "file": file_path
+                }
         
-        # Default to 'unknown' if detection fails
-        return "unknown"
+        return results
+    
+    def _analysis_cache_key(self, content: str, file_path: str, language: str) -> Optional[str]:
+        """Key a file's final analysis by model, prompt version, language, path and content."""
+        if not self.cache:
+            return None
+        digest = hashlib.blake2b(f"{self.model}|{ANALYSIS_CACHE_VERSION}|{language}|{file_path}|".encode("utf-8"), digest_size=16)
+        digest.update(content.encode("utf-8", "replace"))
+        return "analysis:" + digest.hexdigest()
+    
+    def _cached_analysis(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a previously stored analysis result for key, if any."""
+        if key is None:
+            return None
+        cached = self.cache.get(key)
+        return orjson.loads(cached) if cached is not None else None
+    
+    def _store_analysis(self, key: Optional[str], result: Dict[str, Any], parsed: bool) -> Dict[str, Any]:
+        """
+        Store a successful analysis result under key and return it.
+        
+        Results built from responses that did not parse as JSON are returned but not stored,
+        so the file is analyzed again on the next call instead of replaying the fallback.
+        """
+        if key is not None and parsed and "error" not in result:
+            self.cache.set(key, orjson.dumps(result).decode("utf-8"))
+        return result
+    
+    def _code_analysis_request(self, content: str, file_path: str, language: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for analyzing a single file."""
+        # Prepare the prompt for the LLM
+        prompt = self._create_analysis_prompt(content, file_path, language)
+        return self._analysis_request(prompt, _BASE_ANALYSIS_TOKENS + len(prompt) // 4)
+    
+    def _analysis_request(self, prompt: str, max_tokens: int) -> Dict[str, Any]:
+        """Build the chat completion arguments for a code analysis prompt."""
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            # Deterministic sampling so re-analysis reproduces earlier results
+            "temperature": 0.0,
+            "seed": 0,
+            "max_tokens": min(max_tokens, self.max_tokens),
+            "response_format": {"type": "json_object"}  # Request JSON response
+        }
+    
+    def _content_chunks(self, content: str, language: str) -> List[str]:
+        """Return the file content whole, or in overlapping chunks if it is too long for one prompt."""
+        if len(content) <= self.max_prompt_chars:
+            return [content]
+        content = self._compact(content, language, truncate=False)
+        return _chunk_content(content, self.max_prompt_chars, _CHUNK_OVERLAP_CHARS)
+    
+    def _chunk_analysis_request(self, chunk: str, file_path: str, language: str, index: int, total: int) -> Dict[str, Any]:
+        """Build the chat completion arguments for analyzing one chunk of an oversized file."""
+        filename = os.path.basename(file_path)
+        prompt = (f"Analyze part {index + 1} of {total} of the following {language} code from file '{filename}'. "
+                  f"Report only what appears in this part:\n\n```{language}\n{chunk}\n```")
+        return self._analysis_request(prompt, _BASE_ANALYSIS_TOKENS + len(prompt) // 4)
+    
+    def _chunk_summary_request(self, summaries: List[str], file_path: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for merging the chunk summaries of a file into one."""
+        parts = "\n".join(f"{index + 1}. {summary}" for index, summary in enumerate(summaries))
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "user", "content": f"These are summaries of consecutive parts of the file "
+                                            f"'{os.path.basename(file_path)}'. Merge them into one concise "
+                                            f"summary of the whole file:\n\n{parts}"}
+            ],
+            "temperature": 0.2,
+            "max_tokens": _CHUNK_SUMMARY_TOKENS
+        }
+    
+    def _merge_chunk_analyses(self, chunk_texts: List[str], file_path: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Merge the JSON analyses of the chunks of a file, deduplicating repeated list items.
+        
+        Args:
+            chunk_texts: The raw response text for each chunk, in order
+            file_path: Path to the file being analyzed
+            
+        Returns:
+            The merged analysis data, with "summary" holding the list of chunk summaries,
+            and whether every chunk response parsed as JSON
+        """
+        parts = []
+        for analysis_text in chunk_texts:
+            try:
+                analysis_data = orjson.loads(analysis_text)
+            except orjson.JSONDecodeError:
+                logger.warning(f"Failed to parse JSON response for a chunk of {file_path}.")
+                continue
+            if isinstance(analysis_data, dict):
+                parts.append(analysis_data)
+        
+        summaries = [part.pop("summary") for part in parts if isinstance(part.get("summary"), str) and part["summary"]]
+        merged = _merge_values("", parts) if parts else self._empty_analysis()
+        merged["summary"] = summaries or ["No summary available."]
+        return merged, len(parts) == len(chunk_texts)
+    
+    def _build_chunked_analysis(self, analysis_data: Dict[str, Any], chunk_texts: List[str],
+                                content: str, language: str, file_path: str) -> Dict[str, Any]:
+        """Turn the merged analysis of an oversized file into the analysis result."""
+        analysis_data = self._enhance_analysis(analysis_data, content, language, file_path)
+        return {
+            "file": file_path,
+            "language": language,
+            "llm_analysis": analysis_data,
+            "raw_response": "\n\n".join(chunk_texts)
+        }
+    
+    def _build_code_analysis(self, analysis_text: str, content: str, language: str,
+                             file_path: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        Turn the raw LLM response for a file into the analysis result.
+        
+        Args:
+            analysis_text: The raw response text from the LLM
+            content: The source code content
+            language: Programming language of the code
+            file_path: Path to the file being analyzed
+            
+        Returns:
+            Dictionary containing LLM analysis results, and whether the response parsed as JSON
+        """
+        # Requests use JSON mode, so the response normally parses directly
+        parsed = True
+        try:
+            analysis_data = orjson.loads(analysis_text)
+        except orjson.JSONDecodeError:
+            parsed = False
+            if self.text_fallback:
+                # Fall back to processing the text response
+                analysis_data = self._process_text_analysis(analysis_text)
+                logger.warning(f"Failed to parse JSON response for {file_path}. Falling back to text processing.")
+            else:
+                analysis_data = self._empty_analysis()
+                analysis_data["summary"] = "Analysis could not be completed in structured format. Please see raw response."
+                logger.warning(f"Failed to parse JSON response for {file_path}.")
+        
+        # Enhance the analysis with additional metadata
+        analysis_data = self._enhance_analysis(analysis_data, content, language, file_path)
+        
+        return {
+            "file": file_path,
+            "language": language,
+            "llm_analysis": analysis_data,
+            "raw_response": analysis_text
+        }, parsed
+    
+    async def aprefetch(self, file_paths: List[str]) -> Dict[str, str]:
+        """
+        Read many files concurrently on worker threads.
+        
+        Args:
+            file_paths: Paths of the files to read
+            
+        Returns:
+            Dictionary mapping file paths to their contents; unreadable files are left out
+        """
+        semaphore = asyncio.Semaphore(_PREFETCH_CONCURRENCY)
+        
+        async def read_one(file_path: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(_read_text, file_path)
+                except OSError as e:
+                    logger.warning(f"Could not read {file_path}: {str(e)}")
+                    return None
+        
+        paths = list(dict.fromkeys(file_paths))
+        contents = await asyncio.gather(*[read_one(file_path) for file_path in paths])
+        return {file_path: content for file_path, content in zip(paths, contents) if content is not None}
+    
+    def prefetch(self, file_paths: List[str]) -> Dict[str, str]:
+        """
+        Synchronous wrapper around aprefetch for callers without an event loop.
+        
+        Args:
+            file_paths: Paths of the files to read
+            
+        Returns:
+            Dictionary mapping file paths to their contents; unreadable files are left out
+        """
+        return asyncio.run(self.aprefetch(file_paths))
     
-    def analyze_code(self, content: str, file_path: str, language: Optional[str] = None) -> Dict[str, Any]:
+    def analyze_project_structure(self, file_paths: List[str], file_contents: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
-        Analyze code using an LLM to get advanced insights.
-        Enhanced to provide deeper analysis of legacy codebases.
+        Analyze the overall project structure and generate lineage information.
+        Enhanced to provide more comprehensive analysis of legacy codebases.
         
         Args:
-            content: The source code content
-            file_path: Path to the file being analyzed
-            language: Programming language of the code (optional, will be detected if not provided)
+            file_paths: List of all file paths in the project
+            file_contents: Dictionary mapping file paths to their contents. If None, the files are read from disk.
             
         Returns:
-            Dictionary containing LLM analysis results
+            Project structure analysis with detailed lineage metadata
         """
         if not self.client:
             return {
                 "error": "No API key provided. Set the OPENAI_API_KEY environment variable or pass an API key to the constructor."
             }
         
-        # Detect language if not provided
-        if not language or language == "unknown":
-            language = self.detect_language(file_path, content)
+        if file_contents is None:
+            file_contents = self.prefetch(file_paths)
             
         try:
-            # Prepare the prompt for the LLM
-            prompt = self._create_analysis_prompt(content, file_path, language)
-            
-            # Call the OpenAI API using the new client interface
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert code analyzer with deep knowledge of all programming languages, particularly legacy systems. Analyze the given code and provide detailed insights about its structure, purpose, variables, transformations, external API communications, quality, and technical debt. Focus on helping users understand complex or legacy codebases."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,  # Lower temperature for more consistent analysis
-                max_tokens=4000,   # Increased token limit for more detailed analysis
-                response_format={"type": "json_object"}  # Request JSON response
-            )
-            
-            # Parse the response
-            analysis_text = response.choices[0].message.content
-            
-            # Try to extract structured data from the JSON response
-            try:
-                analysis_data = json.loads(analysis_text)
-            except json.JSONDecodeError:
-                # Fall back to processing the text response
-                analysis_data = self._process_text_analysis(analysis_text)
-                logger.warning(f"Failed to parse JSON response for {file_path}. Falling back to text processing.")
-            
-            # Enhance the analysis with additional metadata
-            analysis_data = self._enhance_analysis(analysis_data, content, language, file_path)
-            
-            return {
-                "file": file_path,
-                "language": language,
-                "llm_analysis": analysis_data,
-                "raw_response": analysis_text
+            # Detect each file's language once
+            languages = {
+                file_path: self.detect_language(file_path, file_contents[file_path])
+                for file_path in file_paths if file_path in file_contents
             }
+            context = self._project_context(file_paths, file_contents, languages)
+            
+            # Call the OpenAI API
+            analysis_text = self._complete(self._project_structure_request(context))
+            return self._build_project_analysis(analysis_text, file_paths, file_contents, context)
             
         except Exception as e:
-            logger.error(f"Error during LLM analysis of {file_path}: {str(e)}")
+            logger.error(f"Error during project structure analysis: {str(e)}")
             return {
-                "error": f"Error during LLM analysis: {str(e)}",
-                "file": file_path
+                "error": f"Error during project structure analysis: {str(e)}"
             }
     
-    def analyze_project_structure(self, file_paths: List[str], file_contents: Dict[str, str]) -> Dict[str, Any]:
+    async def aanalyze_project_structure(self, file_paths: List[str], file_contents: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
-        Analyze the overall project structure and generate lineage information.
-        Enhanced to provide more comprehensive analysis of legacy codebases.
+        Async variant of analyze_project_structure; languages are detected concurrently.
         
         Args:
             file_paths: List of all file paths in the project
-            file_contents: Dictionary mapping file paths to their contents
+            file_contents: Dictionary mapping file paths to their contents. If None, the files are read from disk.
             
         Returns:
             Project structure analysis with detailed lineage metadata
@@ -272,37 +1592,74 @@ class LLMAnalyzer:
             return {
                 "error": "No API key provided. Set the OPENAI_API_KEY environment variable or pass an API key to the constructor."
             }
+        
+        if file_contents is None:
+            file_contents = await self.aprefetch(file_paths)
+        
+        async with self._async_client_scope():
+            try:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
             
-        try:
-            # Prepare file list with languages
-            file_info = []
-            language_stats = {}
+                async def detect_one(file_path: str) -> str:
+                    async with semaphore:
+                        return await self.adetect_language(file_path, file_contents[file_path])
             
-            # Analyze file types and languages
-            for file_path in file_paths:
-                if file_path in file_contents:
-                    language = self.detect_language(file_path, file_contents[file_path])
-                    file_info.append(f"{file_path} ({language})")
-                    
-                    # Track language statistics
-                    if language not in language_stats:
-                        language_stats[language] = 0
-                    language_stats[language] += 1
-                else:
-                    file_info.append(file_path)
+                paths = [file_path for file_path in dict.fromkeys(file_paths) if file_path in file_contents]
+                languages = dict(zip(paths, await asyncio.gather(*[detect_one(file_path) for file_path in paths])))
+                context = self._project_context(file_paths, file_contents, languages)
             
-            # Extract key files for deeper analysis
-            key_files = self._identify_key_files(file_paths, file_contents)
+                analysis_text = await self._acomplete(self._project_structure_request(context))
+                return self._build_project_analysis(analysis_text, file_paths, file_contents, context)
+        
+            except Exception as e:
+                logger.error(f"Error during project structure analysis: {str(e)}")
+                return {
+                    "error": f"Error during project structure analysis: {str(e)}"
+                }
+    
+    def _project_context(self, file_paths: List[str], file_contents: Dict[str, str],
+                         languages: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Gather the local facts about a project that the structure prompt is built from.
+        
+        Args:
+            file_paths: List of all file paths in the project
+            file_contents: Dictionary mapping file paths to their contents
+            languages: Dictionary mapping file paths to their detected languages
             
+        Returns:
+            Dictionary with file_count, file_info, language_stats, key_files and dependencies
+        """
+        # Extract key files for deeper analysis
+        key_files = self._identify_key_files(file_paths, file_contents)
+        
+        return {
+            "file_count": len(file_paths),
+            # Prepare the listing the prompt shows, with languages; the rest of the files are only counted
+            "file_info": [
+                f"{file_path} ({languages[file_path]})" if file_path in languages else file_path
+                for file_path in itertools.islice(file_paths, _PROJECT_FILE_LIST_LIMIT)
+            ],
+            # Track language statistics
+            "language_stats": dict(Counter(languages[file_path] for file_path in file_paths if file_path in languages)),
+            "key_files": key_files,
             # Extract dependencies from key files
-            dependencies = self._extract_dependencies(key_files, file_contents)
-            
-            # Create a prompt for project structure analysis
-            prompt = f"""
+            "dependencies": self._extract_dependencies(key_files, file_contents)
+        }
+    
+    def _project_structure_request(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the chat completion arguments for project structure analysis."""
+        file_info = context["file_info"]
+        language_stats = context["language_stats"]
+        key_files = context["key_files"]
+        dependencies = context["dependencies"]
+        
+        # Create a prompt for project structure analysis
+        prompt = f"""
 Analyze the structure of this project based on the file list and key information below:
 
-File List (showing {len(file_info[:100])} of {len(file_info)} files):
-{chr(10).join(file_info[:100])}
+File List (showing {len(file_info)} of {context["file_count"]} files):
+{chr(10).join(file_info)}
 
 Language Distribution:
 {chr(10).join([f"- {lang}: {count} files" for lang, count in sorted(language_stats.items(), key=lambda x: x[1], reverse=True) if lang != 'unknown'])}
@@ -313,116 +1670,80 @@ Key Files:
 Detected Dependencies:
 {chr(10).join([f"- {dep}" for dep in dependencies[:20]])}
 
-Based on this information, provide a comprehensive analysis of the project structure in JSON format:
-{{
-    "project_type": "<type of project (e.g., web application, API, library, etc.)>",
-    "main_languages": [<list of main programming languages used>],
-    "architecture": "<architectural pattern identified (e.g., MVC, microservices, etc.)>",
-    "entry_points": [<likely entry points or main files>],
-    "dependencies": [
-        {{
-            "name": "<dependency name>",
-            "purpose": "<what this dependency is used for>",
-            "type": "<framework, library, tool, etc.>"
-        }}
-    ],
-    "code_lineage": {{
-        "purpose": "<overall purpose of the codebase>",
-        "history": "<likely evolution of the codebase>",
-        "organization": "<how the code is organized>",
-        "complexity": "<assessment of codebase complexity>"
-    }},
-    "technical_stack": {{
-        "frontend": [<frontend technologies>],
-        "backend": [<backend technologies>],
-        "database": [<database technologies>],
-        "infrastructure": [<infrastructure technologies>]
-    }},
-    "data_flow": {{
-        "sources": [<data sources>],
-        "transformations": [<key data transformations>],
-        "sinks": [<data destinations>]
-    }},
-    "key_components": [
-        {{
-            "name": "<component name>",
-            "purpose": "<component purpose>",
-            "files": [<files that make up this component>]
-        }}
-    ],
-    "legacy_aspects": [<list of legacy code patterns or technologies>],
-    "modernization_opportunities": [<suggestions for modernizing the codebase>],
-    "summary": "<overall assessment of the project structure>"
-}}
-
-Focus on providing accurate insights about the project's structure, purpose, technical stack, and lineage. If you're uncertain about any aspect, provide your best assessment based on the available information.
+Provide a comprehensive analysis of the project structure based on this information.
 """
+        
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": _PROJECT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.0,
+            "seed": 0,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_object"}  # Request JSON response
+        }
+    
+    def _build_project_analysis(self, analysis_text: str, file_paths: List[str],
+                                file_contents: Dict[str, str], context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn the raw LLM response for a project into the project structure result.
+        
+        Args:
+            analysis_text: The raw response text from the LLM
+            file_paths: List of all file paths in the project
+            file_contents: Dictionary mapping file paths to their contents
+            context: Project facts returned by _project_context
             
-            # Call the OpenAI API
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert software architect with deep knowledge of project structures across all programming languages and frameworks. You specialize in analyzing legacy codebases and providing insights about their structure, purpose, and technical stack."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=4000,
-                response_format={"type": "json_object"}  # Request JSON response
-            )
-            
-            # Parse the response
-            analysis_text = response.choices[0].message.content
-            
-            # Extract JSON data
-            try:
-                analysis_data = json.loads(analysis_text)
-                
-                # Enhance the analysis with additional metadata
-                analysis_data = self._enhance_project_analysis(analysis_data, file_paths, file_contents, language_stats, dependencies)
-                
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing JSON response: {str(e)}")
-                # Create a basic structure if JSON parsing fails
-                analysis_data = {
-                    "project_type": "Unknown",
-                    "main_languages": self._extract_main_languages(file_info),
-                    "architecture": "Could not determine",
-                    "entry_points": self._identify_key_files(file_paths, file_contents)[:5],
-                    "dependencies": [{"name": dep, "purpose": "Unknown", "type": "Unknown"} for dep in dependencies[:10]],
-                    "code_lineage": {
-                        "purpose": "Could not determine the overall purpose of the codebase.",
-                        "history": "Unknown",
-                        "organization": "Unknown",
-                        "complexity": "Unknown"
-                    },
-                    "technical_stack": {
-                        "frontend": [],
-                        "backend": [],
-                        "database": [],
-                        "infrastructure": []
-                    },
-                    "data_flow": {
-                        "sources": [],
-                        "transformations": [],
-                        "sinks": []
-                    },
-                    "key_components": [],
-                    "legacy_aspects": [],
-                    "modernization_opportunities": [],
-                    "summary": "Analysis could not be completed in structured format. Please see raw response."
-                }
+        Returns:
+            Project structure analysis with detailed lineage metadata
+        """
+        # Extract JSON data
+        try:
+            analysis_data = orjson.loads(analysis_text)
             
-            return {
-                "project_structure": analysis_data,
-                "language_stats": language_stats,
-                "raw_response": analysis_text
-            }
+            # Enhance the analysis with additional metadata
+            analysis_data = self._enhance_project_analysis(analysis_data, file_paths, file_contents,
+                                                           context["language_stats"], context["dependencies"])
             
-        except Exception as e:
-            logger.error(f"Error during project structure analysis: {str(e)}")
-            return {
-                "error": f"Error during project structure analysis: {str(e)}"
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Error parsing JSON response: {str(e)}")
+            # Create a basic structure if JSON parsing fails
+            analysis_data = {
+                "project_type": "Unknown",
+                "main_languages": self._extract_main_languages(context["language_stats"]),
+                "architecture": "Could not determine",
+                "entry_points": context["key_files"][:5],
+                "dependencies": [{"name": dep, "purpose": "Unknown", "type": "Unknown"} for dep in context["dependencies"][:10]],
+                "code_lineage": {
+                    "purpose": "Could not determine the overall purpose of the codebase.",
+                    "history": "Unknown",
+                    "organization": "Unknown",
+                    "complexity": "Unknown"
+                },
+                "technical_stack": {
+                    "frontend": [],
+                    "backend": [],
+                    "database": [],
+                    "infrastructure": []
+                },
+                "data_flow": {
+                    "sources": [],
+                    "transformations": [],
+                    "sinks": []
+                },
+                "key_components": [],
+                "legacy_aspects": [],
+                "modernization_opportunities": [],
+                "summary": "Analysis could not be completed in structured format. Please see raw response."
             }
+        
+        return {
+            "project_structure": analysis_data,
+            "language_stats": context["language_stats"],
+            "raw_response": analysis_text
+        }
     
     def _identify_key_files(self, file_paths: List[str], file_contents: Dict[str, str]) -> List[str]:
         """
@@ -435,40 +1756,34 @@ Focus on providing accurate insights about the project's structure, purpose, tec
         Returns:
             List of key file paths
         """
-        key_files = []
-        
-        # Common patterns for key files
-        entry_point_patterns = [
-            "main.py", "app.py", "index.js", "server.js", "application.java",
-            "Program.cs", "Main.java", "App.js", "App.tsx", "index.html"
-        ]
-        
-        config_patterns = [
-            "requirements.txt", "package.json", "setup.py", "pom.xml", 
-            "build.gradle", ".env", "config.json", "settings.py", "webpack.config.js"
-        ]
-        
-        # First, look for exact matches
-        for pattern in entry_point_patterns + config_patterns:
-            for file_path in file_paths:
-                if os.path.basename(file_path) == pattern:
-                    key_files.append(file_path)
-        
-        # Then, look for partial matches in filenames
-        if len(key_files) < 10:
-            for file_path in file_paths:
-                filename = os.path.basename(file_path).lower()
-                if ("main" in filename or "app" in filename or "index" in filename or 
-                    "server" in filename or "application" in filename or "config" in filename):
-                    if file_path not in key_files:
-                        key_files.append(file_path)
-        
-        # Look for files with significant content
-        if len(key_files) < 10:
-            for file_path in file_paths:
-                if file_path in file_contents and len(file_contents[file_path]) > 1000:
-                    if file_path not in key_files:
+        # Classify every file in one pass: exact key-file names (ranked by pattern order),
+        # partial name matches, and files with significant content
+        exact_matches = []
+        partial_matches = []
+        large_files = []
+        for file_path in file_paths:
+            filename = os.path.basename(file_path)
+            rank = _KEY_FILE_RANKS.get(filename)
+            if rank is not None:
+                exact_matches.append((rank, file_path))
+            if _KEY_FILE_HINT_RE.search(filename.lower()):
+                partial_matches.append(file_path)
+            content = file_contents.get(file_path)
+            if content is not None and len(content) > 1000:
+                large_files.append(file_path)
+        
+        # First, exact matches in pattern order
+        exact_matches.sort(key=lambda match: match[0])
+        key_files = [file_path for _, file_path in exact_matches]
+        
+        # Then partial matches in filenames, then files with significant content
+        for candidates in (partial_matches, large_files):
+            if len(key_files) < 10:
+                seen = set(key_files)
+                for file_path in candidates:
+                    if file_path not in seen:
                         key_files.append(file_path)
+                        seen.add(file_path)
         
         return key_files[:20]  # Limit to 20 key files
     
@@ -483,65 +1798,11 @@ Focus on providing accurate insights about the project's structure, purpose, tec
         Returns:
             List of detected dependencies
         """
-        dependencies = set()
-        
+        # Insertion-ordered so the project prompt (and its cache key) is stable across runs
+        dependencies: Dict[str, None] = {}
         for file_path in key_files:
-            if file_path not in file_contents:
-                continue
-                
-            content = file_contents[file_path]
-            ext = os.path.splitext(file_path)[1].lower()
-            
-            # Python dependencies
-            if ext == ".py":
-                # Look for import statements
-                import_patterns = [
-                    r"import\s+([a-zA-Z0-9_.]+)",
-                    r"from\s+([a-zA-Z0-9_.]+)\s+import"
-                ]
-                
-                for pattern in import_patterns:
-                    for match in re.finditer(pattern, content):
-                        module = match.group(1).split(".")[0]
-                        if module not in ["__future__", "typing", "os", "sys", "re", "json", "time", "datetime"]:
-                            dependencies.add(module)
-            
-            # JavaScript/TypeScript dependencies
-            elif ext in [".js", ".jsx", ".ts", ".tsx"]:
-                # Look for import statements and require calls
-                import_patterns = [
-                    r"import.*?from\s+['\"]([^.][^'\"]+)['\"]",
-                    r"require\(['\"]([^.][^'\"]+)['\"]\)"
-                ]
-                
-                for pattern in import_patterns:
-                    for match in re.finditer(pattern, content):
-                        module = match.group(1)
-                        dependencies.add(module)
-            
-            # Package.json
-            elif os.path.basename(file_path) == "package.json":
-                try:
-                    package_data = json.loads(content)
-                    if "dependencies" in package_data:
-                        for dep in package_data["dependencies"]:
-                            dependencies.add(dep)
-                    if "devDependencies" in package_data:
-                        for dep in package_data["devDependencies"]:
-                            dependencies.add(dep)
-                except:
-                    pass
-            
-            # Requirements.txt
-            elif os.path.basename(file_path) == "requirements.txt":
-                for line in content.split("\n"):
-                    line = line.strip()
-                    if line and not line.startswith("#"):
-                        # Extract package name (remove version specifiers)
-                        package = re.split(r'[=<>~]', line)[0].strip()
-                        if package:
-                            dependencies.add(package)
-        
+            if file_path in file_contents:
+                dependencies.update(dict.fromkeys(_file_dependencies(file_path, file_contents[file_path])))
         return list(dependencies)
     
     def _enhance_project_analysis(self, analysis_data: Dict[str, Any], 
@@ -605,105 +1866,41 @@ Focus on providing accurate insights about the project's structure, purpose, tec
             Prompt string for the LLM
         """
         filename = os.path.basename(file_path)
+        content = self._compact(content, language)
         
-        prompt = f"""
-Please analyze the following {language} code from file '{filename}':
-
-```{language}
-{content}
-```
-
-Provide a comprehensive analysis in JSON format with the following structure:
-{{
-    "code_quality": {{
-        "score": <0-100 score>,
-        "strengths": [<list of code strengths>],
-        "weaknesses": [<list of code weaknesses>]
-    }},
-    "variables": {{
-        "important_variables": [
-            {{
-                "name": "<variable name>",
-                "type": "<variable type if detectable>",
-                "purpose": "<brief description of the variable's purpose>",
-                "transformations": [<list of transformations applied to this variable>]
-            }}
-        ]
-    }},
-    "functions": {{
-        "count": <number of functions/methods>,
-        "important_functions": [
-            {{
-                "name": "<function name>",
-                "purpose": "<brief description of what the function does>",
-                "parameters": [<list of parameters>],
-                "return_value": "<description of what the function returns>"
-            }}
-        ]
-    }},
-    "classes": {{
-        "count": <number of classes>,
-        "important_classes": [
-            {{
-                "name": "<class name>",
-                "purpose": "<brief description of the class's purpose>",
-                "properties": [<list of important properties>],
-                "methods": [<list of important methods>]
-            }}
-        ]
-    }},
-    "external_communications": {{
-        "apis": [
-            {{
-                "name": "<API name or endpoint>",
-                "purpose": "<what this API is used for>",
-                "method": "<HTTP method if applicable>"
-            }}
-        ],
-        "databases": [
-            {{
-                "type": "<database type>",
-                "operations": [<list of operations performed>]
-            }}
-        ],
-        "file_operations": [<list of file operations performed>]
-    }},
-    "data_transformations": [
-        {{
-            "description": "<description of data transformation>",
-            "input": "<input data format or source>",
-            "output": "<output data format or destination>"
-        }}
-    ],
-    "architecture": {{
-        "patterns": [<identified design patterns>],
-        "anti_patterns": [<identified anti-patterns>],
-        "suggestions": [<architectural improvement suggestions>]
-    }},
-    "security": {{
-        "vulnerabilities": [<potential security issues>],
-        "severity": <"low", "medium", or "high">,
-        "mitigations": [<security improvement suggestions>]
-    }},
-    "summary": "<overall assessment in 2-3 sentences>"
-}}
-
-Focus on providing actionable insights and specific information about variables, transformations, and external communications. If a section is not applicable, include an empty list or appropriate default values.
-"""
-        return prompt
+        # The output schema and instructions live in the system message
+        return f"Analyze the following {language} code from file '{filename}':\n\n```{language}\n{content}\n```"
     
-    def _process_text_analysis(self, analysis_text: str) -> Dict[str, Any]:
+    def _compact(self, content: str, language: str, truncate: bool = True) -> str:
         """
-        Process a text analysis response into structured data.
+        Shrink file content before it is embedded in a prompt.
         
         Args:
-            analysis_text: The text response from the LLM
+            content: The source code content
+            language: Programming language of the code
+            truncate: Cut the content down to max_prompt_chars
             
         Returns:
-            Structured data extracted from the text
+            The content without redundant whitespace, truncated to max_prompt_chars if requested
         """
+        if language == "python":
+            content = _strip_python_comment_lines(content)
+        content = _TRAILING_WS_RE.sub("", content)
+        content = _BLANK_RUN_RE.sub("\n\n", content)
+        
+        # Keep the head and tail of oversized files; both usually carry the most context
+        if truncate and len(content) > self.max_prompt_chars:
+            head = self.max_prompt_chars * 3 // 4
+            tail = self.max_prompt_chars - head
+            omitted = len(content) - head - tail
+            content = f"{content[:head]}\n... <TRUNCATED {omitted} characters> ...\n{content[-tail:]}"
+        return content
+    
+    @staticmethod
+    def _empty_analysis() -> Dict[str, Any]:
+        """Return the default per-file analysis structure."""
         # Default structure with enhanced fields for variables, transformations, and external communications
-        analysis_data = {
+        return {
             "code_quality": {
                 "score": 0,
                 "strengths": [],
@@ -738,188 +1935,216 @@ Focus on providing actionable insights and specific information about variables,
             },
             "summary": "No summary available."
         }
+    
+    def _process_text_analysis(self, analysis_text: str) -> Dict[str, Any]:
+        """
+        Process a text analysis response into structured data, reusing the result for repeated responses.
+        
+        Args:
+            analysis_text: The text response from the LLM
+            
+        Returns:
+            Structured data extracted from the text, as a fresh copy the caller may modify
+        """
+        digest = hashlib.blake2b(analysis_text.encode("utf-8", "replace"), digest_size=16).digest()
+        serialized = self._text_analysis_cache.get(digest)
+        if serialized is None:
+            serialized = orjson.dumps(self._parse_text_analysis(analysis_text))
+            self._text_analysis_cache[digest] = serialized
+            if len(self._text_analysis_cache) > _TEXT_ANALYSIS_CACHE_SIZE:
+                self._text_analysis_cache.popitem(last=False)
+        else:
+            self._text_analysis_cache.move_to_end(digest)
+        
+        # Results are kept serialized so every caller gets its own copy cheaply
+        return orjson.loads(serialized)
+    
+    def _parse_text_analysis(self, analysis_text: str) -> Dict[str, Any]:
+        """
+        Parse a text analysis response into structured data.
+        
+        Args:
+            analysis_text: The text response from the LLM
+            
+        Returns:
+            Structured data extracted from the text
+        """
+        analysis_data = self._empty_analysis()
+        
+        # Lowercase and index the section headers once; every section lookup below works on these
+        lower_text = analysis_text.lower()
+        sections = _index_sections(lower_text)
         
         # Extract code quality score
-        if "code quality" in analysis_text.lower() and "score" in analysis_text.lower():
-            for line in analysis_text.split("\n"):
-                if "code quality" in line.lower() and "score" in line.lower():
-                    try:
-                        score = int(''.join(filter(str.isdigit, line)))
+        if "code quality" in lower_text and "score" in lower_text:
+            # Lowercasing leaves line breaks and digits alone, so the lowered lines serve for both
+            for line in lower_text.splitlines():
+                if "code quality" in line and "score" in line:
+                    # Take the first number after "score", so list numbering and "/100" are ignored
+                    score_match = _SCORE_RE.search(line, line.find("score"))
+                    if score_match:
+                        score = int(score_match.group(1))
                         if 0 <= score <= 100:
                             analysis_data["code_quality"]["score"] = score
-                    except ValueError:
-                        pass
+                            break
+        
+        # Cut out every section once up front; a section missing from the response comes back empty
+        section_texts = {
+            section_name: self._extract_section(analysis_text, lower_text, sections, section_name)
+            for section_name in _TEXT_SECTIONS
+        }
         
         # Extract strengths
-        if "strength" in analysis_text.lower():
-            strengths_section = self._extract_section(analysis_text, "strength")
-            if strengths_section:
-                strengths = self._extract_list_items(strengths_section)
-                if strengths:
-                    analysis_data["code_quality"]["strengths"] = strengths
+        strengths_section = section_texts["strength"]
+        if strengths_section:
+            strengths = self._extract_list_items(strengths_section)
+            if strengths:
+                analysis_data["code_quality"]["strengths"] = strengths
         
         # Extract weaknesses
-        if "weakness" in analysis_text.lower():
-            weaknesses_section = self._extract_section(analysis_text, "weakness")
-            if weaknesses_section:
-                weaknesses = self._extract_list_items(weaknesses_section)
-                if weaknesses:
-                    analysis_data["code_quality"]["weaknesses"] = weaknesses
+        weaknesses_section = section_texts["weakness"]
+        if weaknesses_section:
+            weaknesses = self._extract_list_items(weaknesses_section)
+            if weaknesses:
+                analysis_data["code_quality"]["weaknesses"] = weaknesses
         
         # Extract variables information
-        if "variable" in analysis_text.lower():
-            variables_section = self._extract_section(analysis_text, "variable")
-            if variables_section:
-                # Try to extract structured variable information
-                var_items = self._extract_list_items(variables_section)
-                if var_items:
-                    for item in var_items:
-                        var_info = {"name": "unknown", "type": "unknown", "purpose": item, "transformations": []}
-                        # Try to extract variable name
-                        name_match = re.search(r'`([^`]+)`|"([^"]+)"|\'([^\']+)\'', item)
-                        if name_match:
-                            var_name = next(filter(None, name_match.groups()))
-                            var_info["name"] = var_name
-                        analysis_data["variables"]["important_variables"].append(var_info)
+        variables_section = section_texts["variable"]
+        if variables_section:
+            # Try to extract structured variable information
+            var_items = self._extract_list_items(variables_section)
+            if var_items:
+                for item in var_items:
+                    var_info = {"name": "unknown", "type": "unknown", "purpose": item, "transformations": []}
+                    # Try to extract variable name
+                    name_match = _NAME_RE.search(item)
+                    if name_match:
+                        var_name = name_match[1] or name_match[2] or name_match[3]
+                        var_info["name"] = var_name
+                    analysis_data["variables"]["important_variables"].append(var_info)
         
         # Extract functions information
-        if "function" in analysis_text.lower():
-            functions_section = self._extract_section(analysis_text, "function")
-            if functions_section:
-                # Try to extract function count
-                count_match = re.search(r'(\d+)\s+functions?', functions_section.lower())
-                if count_match:
-                    analysis_data["functions"]["count"] = int(count_match.group(1))
-                
-                # Extract function information
-                func_items = self._extract_list_items(functions_section)
-                if func_items:
-                    for item in func_items:
-                        func_info = {"name": "unknown", "purpose": item, "parameters": [], "return_value": ""}
-                        # Try to extract function name
-                        name_match = re.search(r'`([^`]+)`|"([^"]+)"|\'([^\']+)\'', item)
-                        if name_match:
-                            func_name = next(filter(None, name_match.groups()))
-                            func_info["name"] = func_name
-                        analysis_data["functions"]["important_functions"].append(func_info)
+        functions_section = section_texts["function"]
+        if functions_section:
+            # Try to extract function count
+            count_match = _FUNC_COUNT_RE.search(functions_section)
+            if count_match:
+                analysis_data["functions"]["count"] = int(count_match.group(1))
+            
+            # Extract function information
+            func_items = self._extract_list_items(functions_section)
+            if func_items:
+                for item in func_items:
+                    func_info = {"name": "unknown", "purpose": item, "parameters": [], "return_value": ""}
+                    # Try to extract function name
+                    name_match = _NAME_RE.search(item)
+                    if name_match:
+                        func_name = name_match[1] or name_match[2] or name_match[3]
+                        func_info["name"] = func_name
+                    analysis_data["functions"]["important_functions"].append(func_info)
         
         # Extract classes information
-        if "class" in analysis_text.lower():
-            classes_section = self._extract_section(analysis_text, "class")
-            if classes_section:
-                # Try to extract class count
-                count_match = re.search(r'(\d+)\s+classes?', classes_section.lower())
-                if count_match:
-                    analysis_data["classes"]["count"] = int(count_match.group(1))
-                
-                # Extract class information
-                class_items = self._extract_list_items(classes_section)
-                if class_items:
-                    for item in class_items:
-                        class_info = {"name": "unknown", "purpose": item, "properties": [], "methods": []}
-                        # Try to extract class name
-                        name_match = re.search(r'`([^`]+)`|"([^"]+)"|\'([^\']+)\'', item)
-                        if name_match:
-                            class_name = next(filter(None, name_match.groups()))
-                            class_info["name"] = class_name
-                        analysis_data["classes"]["important_classes"].append(class_info)
+        classes_section = section_texts["class"]
+        if classes_section:
+            # Try to extract class count
+            count_match = _CLASS_COUNT_RE.search(classes_section)
+            if count_match:
+                analysis_data["classes"]["count"] = int(count_match.group(1))
+            
+            # Extract class information
+            class_items = self._extract_list_items(classes_section)
+            if class_items:
+                for item in class_items:
+                    class_info = {"name": "unknown", "purpose": item, "properties": [], "methods": []}
+                    # Try to extract class name
+                    name_match = _NAME_RE.search(item)
+                    if name_match:
+                        class_name = name_match[1] or name_match[2] or name_match[3]
+                        class_info["name"] = class_name
+                    analysis_data["classes"]["important_classes"].append(class_info)
         
         # Extract external API communications
-        if "api" in analysis_text.lower() or "external" in analysis_text.lower():
-            api_section = self._extract_section(analysis_text, "api")
-            if api_section:
-                api_items = self._extract_list_items(api_section)
-                if api_items:
-                    for item in api_items:
-                        api_info = {"name": "unknown", "purpose": item, "method": ""}
-                        # Try to extract API name/endpoint
-                        name_match = re.search(r'`([^`]+)`|"([^"]+)"|\'([^\']+)\'', item)
-                        if name_match:
-                            api_name = next(filter(None, name_match.groups()))
-                            api_info["name"] = api_name
-                        analysis_data["external_communications"]["apis"].append(api_info)
+        api_section = section_texts["api"]
+        if api_section:
+            api_items = self._extract_list_items(api_section)
+            if api_items:
+                for item in api_items:
+                    api_info = {"name": "unknown", "purpose": item, "method": ""}
+                    # Try to extract API name/endpoint
+                    name_match = _NAME_RE.search(item)
+                    if name_match:
+                        api_name = name_match[1] or name_match[2] or name_match[3]
+                        api_info["name"] = api_name
+                    analysis_data["external_communications"]["apis"].append(api_info)
         
         # Extract data transformations
-        if "transformation" in analysis_text.lower():
-            transform_section = self._extract_section(analysis_text, "transformation")
-            if transform_section:
-                transform_items = self._extract_list_items(transform_section)
-                if transform_items:
-                    for item in transform_items:
-                        transform_info = {"description": item, "input": "", "output": ""}
-                        analysis_data["data_transformations"].append(transform_info)
+        transform_section = section_texts["transformation"]
+        if transform_section:
+            transform_items = self._extract_list_items(transform_section)
+            if transform_items:
+                for item in transform_items:
+                    transform_info = {"description": item, "input": "", "output": ""}
+                    analysis_data["data_transformations"].append(transform_info)
         
         # Extract security information
-        if "security" in analysis_text.lower() or "vulnerabilit" in analysis_text.lower():
-            security_section = self._extract_section(analysis_text, "security")
-            if security_section:
-                vulnerabilities = self._extract_list_items(security_section)
-                if vulnerabilities:
-                    analysis_data["security"]["vulnerabilities"] = vulnerabilities
-                
-                # Determine severity
-                if "high" in security_section.lower() and "severity" in security_section.lower():
-                    analysis_data["security"]["severity"] = "high"
-                elif "medium" in security_section.lower() and "severity" in security_section.lower():
-                    analysis_data["security"]["severity"] = "medium"
+        security_section = section_texts["security"]
+        if security_section:
+            vulnerabilities = self._extract_list_items(security_section)
+            if vulnerabilities:
+                analysis_data["security"]["vulnerabilities"] = vulnerabilities
+            
+            # Determine severity
+            security_lower = security_section.lower()
+            if "high" in security_lower and "severity" in security_lower:
+                analysis_data["security"]["severity"] = "high"
+            elif "medium" in security_lower and "severity" in security_lower:
+                analysis_data["security"]["severity"] = "medium"
         
         # Extract summary
-        if "summary" in analysis_text.lower():
-            summary_section = self._extract_section(analysis_text, "summary")
-            if summary_section:
-                # Take the first paragraph after "summary"
-                summary = summary_section.strip().split("\n\n")[0]
-                if summary:
-                    analysis_data["summary"] = summary.strip()
+        summary_section = section_texts["summary"]
+        if summary_section:
+            # Take the first paragraph after "summary" (the section comes back already stripped)
+            summary = summary_section.partition("\n\n")[0]
+            if summary:
+                analysis_data["summary"] = summary.strip()
         
         return analysis_data
     
-    def _extract_section(self, text: str, section_name: str) -> str:
+    def _extract_section(self, text: str, lower_text: str, sections: Tuple[List[int], List[str]],
+                         section_name: str) -> str:
         """
         Extract a section from the text based on a section name.
         
         Args:
             text: The full text
+            lower_text: The full text, lowercased
+            sections: Header offsets and names in lower_text, as returned by _index_sections
             section_name: The name of the section to extract
             
         Returns:
             The extracted section text or empty string if not found
         """
-        lower_text = text.lower()
         section_name_lower = section_name.lower()
         
-        if section_name_lower not in lower_text:
-            return ""
-        
         # Find the start of the section
         start_idx = lower_text.find(section_name_lower)
         if start_idx == -1:
             return ""
         
-        # Find the end of the section (next section or end of text)
-        end_idx = len(text)
-        
-        # Common section headers to look for
-        section_headers = ["code quality", "variables", "functions", "classes", 
-                          "external communications", "data transformations", 
-                          "architecture", "security", "summary", "conclusion", 
-                          "recommendation", "strength", "weakness", "api"]
-        
-        for header in section_headers:
-            if header == section_name_lower:
-                continue
-                
-            next_section_idx = lower_text.find(header, start_idx + len(section_name_lower))
-            if next_section_idx != -1 and next_section_idx < end_idx:
-                end_idx = next_section_idx
+        # Find the end of the section: the next header other than this one, or the end of the text
+        positions, headers = sections
+        i = bisect.bisect_left(positions, start_idx + len(section_name_lower))
+        while i < len(positions) and headers[i] == section_name_lower:
+            i += 1
+        end_idx = positions[i] if i < len(positions) else len(text)
         
         # Extract the section
         section_text = text[start_idx:end_idx].strip()
         
         # Remove the section header
-        lines = section_text.split("\n")
-        if len(lines) > 1:
-            return "\n".join(lines[1:]).strip()
+        newline = section_text.find("\n")
+        if newline != -1:
+            return section_text[newline + 1:].strip()
         return ""
     
     def _extract_list_items(self, text: str) -> List[str]:
@@ -932,25 +2157,7 @@ Focus on providing actionable insights and specific information about variables,
         Returns:
             List of extracted items
         """
-        items = []
-        
-        # Split by lines
-        lines = text.split("\n")
-        
-        for line in lines:
-            line = line.strip()
-            
-            # Check for bullet points or numbered lists
-            if line.startswith("- ") or line.startswith("* "):
-                items.append(line[2:].strip())
-            elif line.startswith(". "):
-                items.append(line[2:].strip())
-            elif len(line) >= 3 and line[0].isdigit() and line[1] == "." and line[2] == " ":
-                items.append(line[3:].strip())
-            elif len(line) >= 4 and line[0].isdigit() and line[1].isdigit() and line[2] == "." and line[3] == " ":
-                items.append(line[4:].strip())
-        
-        return items
+        return [match.group(1) for match in _LIST_ITEM_RE.finditer(text)]
     
     def _enhance_analysis(self, analysis_data: Dict[str, Any], content: str, language: str, file_path: str) -> Dict[str, Any]:
         """
@@ -967,18 +2174,21 @@ Focus on providing actionable insights and specific information about variables,
         """
         # Add language-specific information
         if language in self.COMMON_FRAMEWORKS:
-            detected_frameworks = []
-            for framework in self.COMMON_FRAMEWORKS[language]:
-                if framework.lower() in content.lower():
-                    detected_frameworks.append(framework)
+            # Lowercase the content once rather than once per framework
+            content_lower = content.lower()
+            detected_frameworks = [
+                framework for framework in self.COMMON_FRAMEWORKS[language]
+                if framework.lower() in content_lower
+            ]
             
             if detected_frameworks:
                 analysis_data["detected_frameworks"] = detected_frameworks
         
-        # Add file-specific information
+        # Add file-specific information; the extension is taken from the already split-off name
+        file_name = os.path.basename(file_path)
         analysis_data["file_path"] = file_path
-        analysis_data["file_name"] = os.path.basename(file_path)
-        analysis_data["file_extension"] = os.path.splitext(file_path)[1]
+        analysis_data["file_name"] = file_name
+        analysis_data["file_extension"] = os.path.splitext(file_name)[1]
         
         # Enhance data transformation analysis
         if "data_transformations" in analysis_data and analysis_data["data_transformations"]:
@@ -998,23 +2208,10 @@ Focus on providing actionable insights and specific information about variables,
         # Add transformation type if not present
         for transform in transformations:
             if "type" not in transform:
-                # Try to infer transformation type
+                # Try to infer transformation type from the highest-priority keyword in the description
                 desc = transform.get("description", "").lower()
-                
-                if "filter" in desc or "where" in desc:
-                    transform["type"] = "filter"
-                elif "map" in desc or "convert" in desc or "transform" in desc:
-                    transform["type"] = "map"
-                elif "reduce" in desc or "aggregate" in desc or "sum" in desc:
-                    transform["type"] = "reduce"
-                elif "sort" in desc or "order" in desc:
-                    transform["type"] = "sort"
-                elif "join" in desc or "merge" in desc:
-                    transform["type"] = "join"
-                elif "group" in desc:
-                    transform["type"] = "group"
-                else:
-                    transform["type"] = "other"
+                ranks = [_TRANSFORM_KEYWORD_RANKS[keyword] for keyword in _TRANSFORM_KEYWORD_RE.findall(desc)]
+                transform["type"] = _TRANSFORM_TYPES[min(ranks)] if ranks else "other"
     
     def generate_lineage_visualization_data(self, project_analysis: Dict[str, Any], file_analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -1030,7 +2227,11 @@ Focus on providing actionable insights and specific information about variables,
         # Create nodes for components
         nodes = []
         edges = []
-        node_id_map = {}
+        
+        # Index the file analyses by path; the first analysis of a path wins
+        file_analyses_by_path: Dict[Any, Dict[str, Any]] = {}
+        for file_analysis in file_analyses:
+            file_analyses_by_path.setdefault(file_analysis.get("file"), file_analysis)
         
         # Add project as root node
         project_type = project_analysis.get("project_structure", {}).get("project_type", "Unknown Project")
@@ -1041,7 +2242,7 @@ Focus on providing actionable insights and specific information about variables,
             "size": 30
         }
         nodes.append(root_node)
-        node_id_map["project_root"] = 0  # Index in nodes array
+        root_index = 0  # Edges refer to nodes by their index in the nodes array
         
         # Add key components as nodes
         components = project_analysis.get("project_structure", {}).get("key_components", [])
@@ -1054,13 +2255,13 @@ Focus on providing actionable insights and specific information about variables,
                 "purpose": component.get("purpose", ""),
                 "size": 20
             }
+            component_index = len(nodes)
             nodes.append(component_node)
-            node_id_map[component_id] = len(nodes) - 1
             
             # Add edge from project to component
             edges.append({
-                "source": node_id_map["project_root"],
-                "target": node_id_map[component_id],
+                "source": root_index,
+                "target": component_index,
                 "type": "contains"
             })
             
@@ -1068,7 +2269,7 @@ Focus on providing actionable insights and specific information about variables,
             component_files = component.get("files", [])
             for file_path in component_files:
                 # Find the file analysis
-                file_analysis = next((f for f in file_analyses if f.get("file") == file_path), None)
+                file_analysis = file_analyses_by_path.get(file_path) if isinstance(file_path, Hashable) else None
                 if file_analysis:
                     file_id = f"file_{len(nodes)}"
                     file_node = {
@@ -1078,13 +2279,13 @@ Focus on providing actionable insights and specific information about variables,
                         "language": file_analysis.get("language", "unknown"),
                         "size": 10
                     }
+                    file_index = len(nodes)
                     nodes.append(file_node)
-                    node_id_map[file_id] = len(nodes) - 1
                     
                     # Add edge from component to file
                     edges.append({
-                        "source": node_id_map[component_id],
-                        "target": node_id_map[file_id],
+                        "source": component_index,
+                        "target": file_index,
                         "type": "contains"
                     })
         
@@ -1094,106 +2295,69 @@ Focus on providing actionable insights and specific information about variables,
         transformations = data_flow.get("transformations", [])
         sinks = data_flow.get("sinks", [])
         
-        # Add data sources
-        for i, source in enumerate(sources):
-            source_id = f"source_{i}"
-            source_node = {
-                "id": source_id,
-                "label": source if isinstance(source, str) else source.get("name", f"Source {i}"),
-                "type": "data_source",
-                "size": 15
-            }
-            nodes.append(source_node)
-            node_id_map[source_id] = len(nodes) - 1
-            
-            # Connect to project
-            edges.append({
-                "source": node_id_map["project_root"],
-                "target": node_id_map[source_id],
-                "type": "data_input"
-            })
-        
-        # Add data transformations
-        for i, transform in enumerate(transformations):
-            transform_id = f"transform_{i}"
-            transform_node = {
-                "id": transform_id,
-                "label": transform if isinstance(transform, str) else transform.get("name", f"Transform {i}"),
-                "type": "data_transformation",
-                "description": transform.get("description", "") if not isinstance(transform, str) else "",
-                "size": 12
-            }
-            nodes.append(transform_node)
-            node_id_map[transform_id] = len(nodes) - 1
-            
-            # Connect to previous node if available
-            if i > 0:
-                prev_transform_id = f"transform_{i-1}"
-                edges.append({
-                    "source": node_id_map[prev_transform_id],
-                    "target": node_id_map[transform_id],
-                    "type": "data_flow"
-                })
-            elif sources:
-                # Connect to first source
-                source_id = f"source_0"
-                edges.append({
-                    "source": node_id_map[source_id],
-                    "target": node_id_map[transform_id],
-                    "type": "data_flow"
-                })
-        
-        # Add data sinks
-        for i, sink in enumerate(sinks):
-            sink_id = f"sink_{i}"
-            sink_node = {
-                "id": sink_id,
-                "label": sink if isinstance(sink, str) else sink.get("name", f"Sink {i}"),
-                "type": "data_sink",
-                "size": 15
-            }
-            nodes.append(sink_node)
-            node_id_map[sink_id] = len(nodes) - 1
-            
-            # Connect from last transformation or source
-            if transformations:
-                last_transform_id = f"transform_{len(transformations)-1}"
-                edges.append({
-                    "source": node_id_map[last_transform_id],
-                    "target": node_id_map[sink_id],
-                    "type": "data_flow"
-                })
-            elif sources:
-                # Connect from first source
-                source_id = f"source_0"
-                edges.append({
-                    "source": node_id_map[source_id],
-                    "target": node_id_map[sink_id],
-                    "type": "data_flow"
-                })
-        
-        # Add dependencies
+        # Add data sources, each connected to the project
+        source_base = len(nodes)
+        nodes.extend({
+            "id": f"source_{i}",
+            "label": source if isinstance(source, str) else source.get("name", f"Source {i}"),
+            "type": "data_source",
+            "size": 15
+        } for i, source in enumerate(sources))
+        edges.extend({
+            "source": root_index,
+            "target": source_base + i,
+            "type": "data_input"
+        } for i in range(len(sources)))
+        
+        # Add data transformations, chained from the first source
+        transform_base = len(nodes)
+        nodes.extend({
+            "id": f"transform_{i}",
+            "label": transform if isinstance(transform, str) else transform.get("name", f"Transform {i}"),
+            "type": "data_transformation",
+            "description": transform.get("description", "") if not isinstance(transform, str) else "",
+            "size": 12
+        } for i, transform in enumerate(transformations))
+        if transformations and sources:
+            edges.append({"source": source_base, "target": transform_base, "type": "data_flow"})
+        edges.extend({
+            "source": transform_base + i - 1,
+            "target": transform_base + i,
+            "type": "data_flow"
+        } for i in range(1, len(transformations)))
+        
+        # Add data sinks, fed from the last transformation or else the first source
+        sink_base = len(nodes)
+        nodes.extend({
+            "id": f"sink_{i}",
+            "label": sink if isinstance(sink, str) else sink.get("name", f"Sink {i}"),
+            "type": "data_sink",
+            "size": 15
+        } for i, sink in enumerate(sinks))
+        if transformations or sources:
+            feed_index = transform_base + len(transformations) - 1 if transformations else source_base
+            edges.extend({
+                "source": feed_index,
+                "target": sink_base + i,
+                "type": "data_flow"
+            } for i in range(len(sinks)))
+        
+        # Add dependencies, each connected to the project
         dependencies = project_analysis.get("project_structure", {}).get("dependencies", [])
-        for i, dep in enumerate(dependencies):
-            dep_name = dep if isinstance(dep, str) else dep.get("name", f"Dependency {i}")
-            dep_id = f"dependency_{i}"
-            dep_node = {
-                "id": dep_id,
-                "label": dep_name,
-                "type": "dependency",
-                "purpose": dep.get("purpose", "") if not isinstance(dep, str) else "",
-                "dep_type": dep.get("type", "library") if not isinstance(dep, str) else "library",
-                "size": 8
-            }
-            nodes.append(dep_node)
-            node_id_map[dep_id] = len(nodes) - 1
-            
-            # Connect to project
-            edges.append({
-                "source": node_id_map["project_root"],
-                "target": node_id_map[dep_id],
-                "type": "depends_on"
-            })
+        dep_base = len(nodes)
+        nodes.extend({
+            "id": f"dependency_{i}",
+            "label": dep if isinstance(dep, str) else dep.get("name", f"Dependency {i}"),
+            "type": "dependency",
+            "purpose": dep.get("purpose", "") if not isinstance(dep, str) else "",
+            "dep_type": dep.get("type", "library") if not isinstance(dep, str) else "library",
+            "size": 8
+        } for i, dep in enumerate(dependencies))
+        edges.extend({
+            "source": root_index,
+            "target": dep_base + i,
+            "type": "depends_on"
+        } for i in range(len(dependencies)))
         
         return {
             "nodes": nodes,
@@ -1219,77 +2383,56 @@ Focus on providing actionable insights and specific information about variables,
         """
         # Extract project structure information
         project_structure = project_analysis.get("project_structure", {})
+        # Bound once; dict and list defaults stay fresh literals since callers may mutate the result
+        get = project_structure.get
         
         # Build comprehensive lineage metadata
         lineage = {
             "project": {
-                "type": project_structure.get("project_type", "Unknown"),
-                "architecture": project_structure.get("architecture", "Unknown"),
-                "main_languages": project_structure.get("main_languages", []),
-                "entry_points": project_structure.get("entry_points", []),
-                "summary": project_structure.get("summary", "No summary available")
+                "type": get("project_type", "Unknown"),
+                "architecture": get("architecture", "Unknown"),
+                "main_languages": get("main_languages", []),
+                "entry_points": get("entry_points", []),
+                "summary": get("summary", "No summary available")
             },
-            "code_lineage": project_structure.get("code_lineage", {
+            "code_lineage": get("code_lineage", {
                 "purpose": "Unknown",
                 "history": "Unknown",
                 "organization": "Unknown",
                 "complexity": "Unknown"
             }),
-            "technical_stack": project_structure.get("technical_stack", {
+            "technical_stack": get("technical_stack", {
                 "frontend": [],
                 "backend": [],
                 "database": [],
                 "infrastructure": []
             }),
-            "dependencies": project_structure.get("dependencies", []),
-            "data_flow": project_structure.get("data_flow", {
+            "dependencies": get("dependencies", []),
+            "data_flow": get("data_flow", {
                 "sources": [],
                 "transformations": [],
                 "sinks": []
             }),
-            "components": project_structure.get("key_components", []),
-            "legacy_aspects": project_structure.get("legacy_aspects", []),
-            "modernization_opportunities": project_structure.get("modernization_opportunities", []),
-            "file_analyses": []
+            "components": get("key_components", []),
+            "legacy_aspects": get("legacy_aspects", []),
+            "modernization_opportunities": get("modernization_opportunities", []),
+            # Add file analyses
+            "file_analyses": [
+                _file_lineage_data(file_analysis) for file_analysis in file_analyses
+                if "llm_analysis" in file_analysis
+            ]
         }
         
-        # Add file analyses
-        for file_analysis in file_analyses:
-            if "llm_analysis" not in file_analysis:
-                continue
-                
-            analysis = file_analysis["llm_analysis"]
-            file_data = {
-                "file_path": file_analysis.get("file", "Unknown"),
-                "language": file_analysis.get("language", "unknown"),
-                "summary": analysis.get("summary", "No summary available"),
-                "functions": analysis.get("functions", {}).get("important_functions", []),
-                "classes": analysis.get("classes", {}).get("important_classes", []),
-                "data_transformations": analysis.get("data_transformations", []),
-                "external_communications": analysis.get("external_communications", {})
-            }
-            lineage["file_analyses"].append(file_data)
-        
         # Add timestamp and metadata
         lineage["metadata"] = {
             "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
             "total_files_analyzed": len(file_analyses),
-            "file_stats": project_structure.get("file_stats", {})
+            "file_stats": get("file_stats", {})
         }
         
         return lineage
     
-    def _extract_main_languages(self, file_info: List[str]) -> List[str]:
-        """Extract the main languages used in the project based on file extensions."""
-        languages = {}
-        pattern = r"\((.*?)\)$"
-        
-        for file in file_info:
-            match = re.search(pattern, file)
-            if match:
-                lang = match.group(1)
-                languages[lang] = languages.get(lang, 0) + 1
-        
+    def _extract_main_languages(self, language_stats: Dict[str, int]) -> List[str]:
+        """Extract the main languages used in the project from per-language file counts."""
         # Sort by frequency and return top languages
-        sorted_langs = sorted(languages.items(), key=lambda x: x[1], reverse=True)
-        return [lang for lang, _ in sorted_langs[:5]]  # Return top 5 languages
+        return heapq.nlargest(5, language_stats, key=language_stats.get)
@@ -0,0 +1,110 @@
+"""
+Persistent cache for deterministic LLM responses.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class LLMCache:
+    """SQLite-backed cache mapping chat completion requests to response text."""
+
+    def __init__(self, path: str = ".llm_cache.sqlite3", ttl: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path of the SQLite database file (":memory:" for a process-local cache)
+            ttl: Seconds after which an entry expires, or None to keep entries forever
+        """
+        self.path = path
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """
+        Compute the cache key for a chat completion request.
+
+        Args:
+            request: Keyword arguments passed to chat.completions.create
+
+        Returns:
+            Hex SHA-256 digest of the canonical JSON encoding of the request
+        """
+        encoded = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Key produced by make_key
+
+        Returns:
+            The cached response text, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and time.time() - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            self.stats["hits" if row is not None else "misses"] += 1
+        return row[0] if row is not None else None
+
+    def set(self, key: str, response: str) -> None:
+        """
+        Store a response.
+
+        Args:
+            key: Key produced by make_key
+            response: Response text to cache
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.commit()
+
+    def expire(self) -> int:
+        """
+        Delete entries older than the TTL.
+
+        Returns:
+            Number of entries removed
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        """Remove all cached responses."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,83 @@
+"""
+Client-side request and token rate limiting for OpenAI API calls.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Token buckets for requests per minute and tokens per minute."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        """
+        Initialize the rate limiter. Both buckets start full.
+
+        Args:
+            requests_per_minute: Request budget per minute, or None for no request limit
+            tokens_per_minute: Token budget per minute, or None for no token limit
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, n_tokens: int) -> float:
+        """
+        Take one request and n_tokens tokens from the buckets.
+
+        The buckets may go negative; the caller then waits until they have refilled,
+        which keeps concurrent callers in arrival order without holding the lock.
+
+        Args:
+            n_tokens: Estimated prompt plus completion tokens for the request
+
+        Returns:
+            Seconds the caller must wait before sending the request
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_refill
+            self._last_refill = now
+
+            delay = 0.0
+            if self.requests_per_minute:
+                rate = self.requests_per_minute / 60.0
+                self._requests = min(self.requests_per_minute, self._requests + elapsed * rate) - 1
+                if self._requests < 0:
+                    delay = max(delay, -self._requests / rate)
+            if self.tokens_per_minute:
+                rate = self.tokens_per_minute / 60.0
+                # A single request larger than the whole budget can only wait for a full bucket
+                cost = min(n_tokens, self.tokens_per_minute)
+                self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * rate) - cost
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / rate)
+            return delay
+
+    def acquire(self, n_tokens: int) -> None:
+        """
+        Block until a request of n_tokens tokens fits within the limits.
+
+        Args:
+            n_tokens: Estimated prompt plus completion tokens for the request
+        """
+        delay = self._reserve(n_tokens)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self, n_tokens: int) -> None:
+        """
+        Wait without blocking the event loop until a request of n_tokens tokens fits within the limits.
+
+        Args:
+            n_tokens: Estimated prompt plus completion tokens for the request
+        """
+        delay = self._reserve(n_tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
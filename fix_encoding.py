@@ -1,26 +1,39 @@
 import os
+import shutil
+import tempfile
 
 def convert_utf16_to_utf8(file_path):
+    # Only files starting with a UTF-16 byte order mark need converting (UTF-32 LE shares the first two bytes)
+    with open(file_path, 'rb') as f:
+        head = f.read(4)
+    if head[:2] not in (b'\xff\xfe', b'\xfe\xff') or head == b'\xff\xfe\x00\x00':
+        print(f"{file_path} is not UTF-16 (no byte order mark), skipping")
+        return True
+    
     # Create a backup of the original file
     backup_path = file_path + '.bak'
     if not os.path.exists(backup_path):
-        with open(file_path, 'rb') as src:
-            with open(backup_path, 'wb') as dst:
-                dst.write(src.read())
+        shutil.copyfile(file_path, backup_path)
         print(f"Backup created at {backup_path}")
     
+    tmp_path = None
     try:
-        # Read the file as UTF-16
-        with open(file_path, 'r', encoding='utf-16') as f:
-            content = f.read()
+        # Stream the file as UTF-16 into a UTF-8 temporary file next to it
+        with open(file_path, 'r', encoding='utf-16') as src, tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(file_path)), delete=False) as dst:
+            tmp_path = dst.name
+            for chunk in iter(lambda: src.read(65536), ''):
+                dst.write(chunk)
         
-        # Write the file as UTF-8
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        # Swap the converted file into place atomically, keeping the original permissions
+        shutil.copymode(file_path, tmp_path)
+        os.replace(tmp_path, file_path)
         
         print(f"Successfully converted {file_path} from UTF-16 to UTF-8")
         return True
     except Exception as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
         print(f"Error converting file: {e}")
         return False
 
@@ -1,20 +1,31 @@
-import ast
+import hashlib
+import io
+import orjson
 import os
 import re
+import sqlite3
+import threading
 import sqlparse
 import streamlit as st
 import pandas as pd
 import openai
-from typing import List, Dict, Tuple, Set, Optional
+from typing import List, Dict, Iterable, Tuple, Set, Optional
 import networkx as nx
-import matplotlib.pyplot as plt
 from pathlib import Path
 import zipfile
-import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import closing
+
+from script_scanner import is_sql_query, scan_script
 
 # Set your OpenAI API key
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Columns of the source-target mapping, in display order
+MAPPING_COLUMNS = ('source_type', 'source', 'target_type', 'target', 'operation', 'filename')
+# Archive directories that never hold the user's own scripts
+SKIPPED_ARCHIVE_DIRS = frozenset(['.git', '__pycache__', '.venv', 'node_modules'])
+
 # ------------------------- SCRIPT ANALYSIS UTILS -----------------------------
 
 class DataFlowAnalyzer:
@@ -30,119 +41,28 @@ class DataFlowAnalyzer:
             "sql_queries": set(),
             "transformations": [],
             "dataframes": {},
-            "source_target_mapping": []
+            # Column lists, one entry per source-target edge
+            "source_target_mapping": {column: [] for column in MAPPING_COLUMNS}
         }
         self.script_mapping = {}
         
     def extract_python_entities(self, script: str, filename: str) -> Dict:
         """Extract entities from a Python script"""
-        tree = ast.parse(script)
-        functions, variables, file_paths, configs = [], [], [], []
-        sql_variables = {}
-        assignments = {}
-        df_transformations = []
-        dataframes = {}
-
-        # First pass to collect all assignments
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
-                for target in targets:
-                    # Store the exact assignment logic
-                    assignments[target] = ast.unparse(node.value)
-                    variables.append(target)
-                    
-                    # Check if it's a DataFrame creation or transformation
-                    if isinstance(node.value, ast.Call):
-                        func = node.value.func
-                        if hasattr(func, 'attr'):
-                            # Check for pd.read_csv, pd.read_excel, etc.
-                            if hasattr(func, 'value') and hasattr(func.value, 'id') and func.value.id == 'pd' and func.attr.startswith('read_'):
-                                # This is a source dataframe
-                                dataframes[target] = {
-                                    'type': 'source',
-                                    'method': func.attr,
-                                    'source': ast.unparse(node.value.args[0]) if node.value.args else 'unknown'
-                                }
-                            
-                            # Check for DataFrame transformations
-                            df_methods = ['groupby', 'filter', 'sort_values', 'merge', 'join', 'concat', 'apply', 'map', 'pivot', 'melt']
-                            if any(func.attr == method for method in df_methods) and hasattr(func, 'value'):
-                                source_df = ast.unparse(func.value)
-                                df_transformations.append({
-                                    'target': target,
-                                    'source': source_df,
-                                    'operation': func.attr,
-                                    'details': ast.unparse(node.value)
-                                })
-                                # Track as a transformation dataframe
-                                dataframes[target] = {
-                                    'type': 'transformation',
-                                    'method': func.attr,
-                                    'source': source_df
-                                }
-                                
-                # Special handling for file paths and configurations
-                if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
-                    val = node.value.value
-                    if '/' in val or '\\' in val or '.csv' in val or '.xlsx' in val or '.txt' in val:
-                        file_paths.append(val)
-                    elif any(keyword in val.upper() for keyword in ['TABLE', 'CONFIG', 'PARAM', 'SETTING']):
-                        configs.append(val)
-
-        # Second pass for function definitions and SQL queries
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                functions.append(node.name)
-                # Analyze function body for data transformations
-                self._analyze_function_body(node, assignments, df_transformations)
-            
-            # Detect SQL queries in string variables or direct calls
-            elif isinstance(node, ast.Assign):
-                if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
-                    sql = node.value.value
-                    if self._is_sql_query(sql):
-                        targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
-                        for target in targets:
-                            sql_variables[target] = sql
-            
-            # Check for SQL in function calls like spark.sql() or execute_sql()
-            elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
-                call = node.value
-                if hasattr(call.func, 'attr') and call.func.attr in ['sql', 'execute', 'query']:
-                    if call.args:
-                        arg = call.args[0]
-                        if isinstance(arg, ast.Name) and arg.id in assignments:
-                            sql_variables[arg.id] = assignments[arg.id]
-                        elif isinstance(arg, ast.Constant) and isinstance(arg.value, str):
-                            if self._is_sql_query(arg.value):
-                                sql_variables[f"inline_sql_{len(sql_variables)}"] = arg.value
-
-        # Extract business rules by analyzing complex if conditions
-        business_rules = self._extract_business_rules(tree)
-        
-        # Store results for this specific file
-        file_results = {
-            "filename": filename,
-            "functions": list(set(functions)),
-            "variables": list(set(variables)),
-            "file_paths": list(set(file_paths)),
-            "configs": list(set(configs)),
-            "sql_vars": sql_variables,
-            "df_transformations": df_transformations,
-            "dataframes": dataframes,
-            "business_rules": business_rules
-        }
-        
+        # Scan results depend only on the script text, so unchanged files come from the cache
+        file_results = {"filename": filename, **analyze_script(script)}
+        functions = file_results["functions"]
+        sql_variables = file_results["sql_vars"]
+        dataframes = file_results["dataframes"]
+
         self.script_mapping[filename] = file_results
         
         # Update global entities
-        self.all_entities["functions"].update(set(functions))
-        self.all_entities["variables"].update(set(variables))
-        self.all_entities["file_paths"].update(set(file_paths))
-        self.all_entities["configs"].update(set(configs))
-        self.all_entities["sql_queries"].update(set(sql_variables.values()))
-        self.all_entities["transformations"].extend(df_transformations)
+        self.all_entities["functions"].update(functions)
+        self.all_entities["variables"].update(file_results["variables"])
+        self.all_entities["file_paths"].update(file_results["file_paths"])
+        self.all_entities["configs"].update(file_results["configs"])
+        self.all_entities["sql_queries"].update(sql_variables.values())
+        self.all_entities["transformations"].extend(file_results["df_transformations"])
         
         # Update dataframes with filename context
         for df_name, df_info in dataframes.items():
@@ -150,97 +70,52 @@ class DataFlowAnalyzer:
             
             # Add to source-target mapping
             if df_info['type'] == 'source':
-                self.all_entities["source_target_mapping"].append({
-                    'source_type': 'file',
-                    'source': df_info['source'],
-                    'target_type': 'dataframe',
-                    'target': f"{filename}:{df_name}",
-                    'operation': df_info['method'],
-                    'filename': filename
-                })
+                self._add_mapping('file', df_info['source'], 'dataframe', f"{filename}:{df_name}", df_info['method'], filename)
             elif df_info['type'] == 'transformation':
-                self.all_entities["source_target_mapping"].append({
-                    'source_type': 'dataframe',
-                    'source': f"{filename}:{df_info['source']}",
-                    'target_type': 'dataframe',
-                    'target': f"{filename}:{df_name}",
-                    'operation': df_info['method'],
-                    'filename': filename
-                })
+                self._add_mapping('dataframe', f"{filename}:{df_info['source']}", 'dataframe', f"{filename}:{df_name}", df_info['method'], filename)
         
         return file_results
+
+    def _add_mapping(self, source_type: str, source: str, target_type: str, target: str, operation: str, filename: str) -> None:
+        """Append one edge to the column-wise source-target mapping"""
+        for column, value in zip(self.all_entities["source_target_mapping"].values(),
+                                 (source_type, source, target_type, target, operation, filename)):
+            column.append(value)
+
+    @staticmethod
+    def scan_script(script: str) -> Dict:
+        """Extract the entities of a Python script that do not depend on its filename"""
+        return scan_script(script)
     
-    def _is_sql_query(self, text: str) -> bool:
+    @staticmethod
+    def _is_sql_query(text: str) -> bool:
         """Check if a string is likely to be an SQL query"""
-        sql_keywords = ['SELECT', 'FROM', 'WHERE', 'JOIN', 'GROUP BY', 'ORDER BY', 
-                       'CREATE TABLE', 'INSERT INTO', 'UPDATE', 'DELETE FROM']
-        text_upper = text.upper()
-        return any(keyword in text_upper for keyword in sql_keywords)
-    
-    def _analyze_function_body(self, func_node: ast.FunctionDef, assignments: Dict, df_transformations: List) -> None:
-        """Analyze a function body for data transformations"""
-        for node in ast.walk(func_node):
-            if isinstance(node, ast.Assign):
-                targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
-                for target in targets:
-                    # Look for DataFrame operations
-                    if isinstance(node.value, ast.Call) and hasattr(node.value.func, 'attr'):
-                        func = node.value.func
-                        df_methods = ['groupby', 'filter', 'sort_values', 'merge', 'join', 'concat', 'apply']
-                        if any(func.attr == method for method in df_methods) and hasattr(func, 'value'):
-                            source_df = ast.unparse(func.value)
-                            df_transformations.append({
-                                'target': target,
-                                'source': source_df,
-                                'operation': func.attr,
-                                'details': ast.unparse(node.value),
-                                'in_function': func_node.name
-                            })
-    
-    def _extract_business_rules(self, tree: ast.AST) -> List[Dict]:
-        """Extract business rules from conditionals in the code"""
-        rules = []
-        
-        for node in ast.walk(tree):
-            # Extract rules from if statements
-            if isinstance(node, ast.If):
-                rule = {
-                    'type': 'condition',
-                    'condition': ast.unparse(node.test),
-                    'actions': [ast.unparse(stmt) for stmt in node.body if not isinstance(stmt, ast.If)]
-                }
-                rules.append(rule)
-            
-            # Extract rules from function calls that suggest business logic
-            elif isinstance(node, ast.Call) and hasattr(node.func, 'attr'):
-                rule_keywords = ['validate', 'check', 'enforce', 'calculate', 'compute', 'apply_rule']
-                if any(keyword in node.func.attr.lower() for keyword in rule_keywords):
-                    rule = {
-                        'type': 'function_call',
-                        'function': ast.unparse(node.func),
-                        'arguments': [ast.unparse(arg) for arg in node.args],
-                        'full_call': ast.unparse(node)
-                    }
-                    rules.append(rule)
-        
-        return rules
+        return is_sql_query(text)
     
     def parse_sql_tables_and_transformations(self, query: str) -> Dict:
         """Parse SQL query to extract tables and transformations"""
+        # The same query is parsed for the mapping, the SQL tab and the export, so parses are cached
+        return parse_sql_query(query)
+
+    @staticmethod
+    def parse_sql(query: str) -> Dict:
+        """Parse SQL query to extract tables and transformations, without caching"""
         try:
-            parsed = sqlparse.parse(query)
-            if not parsed:
+            # Only the first statement is used, so stop the splitter after it
+            statement = next(sqlparse.parsestream(query), None)
+            if statement is None:
                 return {"tables": [], "columns": [], "transformations": []}
             
-            statement = parsed[0]
             tables = []
             columns = []
             transformations = []
             
-            # Extract tables
+            # Extract tables, columns and transformations in one pass over the top-level tokens
             from_seen = False
+            select_seen = False
             for token in statement.tokens:
-                if token.ttype is sqlparse.tokens.Keyword and token.value.upper() in ("FROM", "JOIN"):
+                ttype = token.ttype
+                if ttype is sqlparse.tokens.Keyword and token.value.upper() in ("FROM", "JOIN"):
                     from_seen = True
                 elif from_seen:
                     if isinstance(token, sqlparse.sql.Identifier):
@@ -250,11 +125,8 @@ class DataFlowAnalyzer:
                         for identifier in token.get_identifiers():
                             tables.append(identifier.get_real_name())
                         from_seen = False
-            
-            # Extract columns and transformations
-            select_seen = False
-            for token in statement.tokens:
-                if token.ttype is sqlparse.tokens.DML and token.value.upper() == "SELECT":
+                
+                if ttype is sqlparse.tokens.DML and token.value.upper() == "SELECT":
                     select_seen = True
                 elif select_seen and isinstance(token, sqlparse.sql.IdentifierList):
                     for identifier in token.get_identifiers():
@@ -270,7 +142,7 @@ class DataFlowAnalyzer:
                             })
                 
                 # Check for GROUP BY, ORDER BY, etc.
-                if token.ttype is sqlparse.tokens.Keyword and token.value.upper() in ["GROUP BY", "ORDER BY", "HAVING"]:
+                if ttype is sqlparse.tokens.Keyword and token.value.upper() in ("GROUP BY", "ORDER BY", "HAVING"):
                     transformations.append({
                         'type': token.value.upper(),
                         'details': str(token.parent)
@@ -296,50 +168,38 @@ class DataFlowAnalyzer:
                 # Add to source-target mapping
                 # The target depends on the SQL operation (SELECT creates a result set)
                 if "SELECT" in query.upper():
-                    self.all_entities["source_target_mapping"].append({
-                        'source_type': 'table',
-                        'source': table,
-                        'target_type': 'query_result',
-                        'target': f"result_of_{table}_query",
-                        'operation': 'SQL_SELECT',
-                        'filename': 'sql_query'
-                    })
+                    self._add_mapping('table', table, 'query_result', f"result_of_{table}_query", 'SQL_SELECT', 'sql_query')
     
     def build_data_flow_graph(self) -> nx.DiGraph:
         """Build a directed graph representing data flow"""
         G = nx.DiGraph()
         
-        # Add nodes for all dataframes
-        for df_key, df_info in self.all_entities["dataframes"].items():
-            G.add_node(df_key, type='dataframe', **df_info)
+        # Add nodes for all dataframes; df_info carries its own 'type', which the node type overrides
+        G.add_nodes_from((df_key, {**df_info, 'type': 'dataframe'}) for df_key, df_info in self.all_entities["dataframes"].items())
         
-        # Add nodes for all sources and targets
-        for mapping in self.all_entities["source_target_mapping"]:
-            source = mapping['source']
-            target = mapping['target']
-            
-            # Add nodes if they don't exist
-            if not G.has_node(source):
-                G.add_node(source, type=mapping['source_type'])
-            
-            if not G.has_node(target):
-                G.add_node(target, type=mapping['target_type'])
-            
-            # Add the edge with operation details
-            G.add_edge(source, target, operation=mapping['operation'], filename=mapping.get('filename', ''))
+        # Add nodes for all sources and targets; the first mapping that mentions a node sets its type
+        mapping = self.all_entities["source_target_mapping"]
+        node_types = {}
+        for source_type, source, target_type, target in zip(mapping['source_type'], mapping['source'], mapping['target_type'], mapping['target']):
+            node_types.setdefault(source, source_type)
+            node_types.setdefault(target, target_type)
+        G.add_nodes_from((node, {'type': node_type}) for node, node_type in node_types.items() if node not in G)
+        
+        # Add the edges with operation details
+        G.add_edges_from(
+            (source, target, {'operation': operation, 'filename': filename})
+            for source, target, operation, filename in zip(mapping['source'], mapping['target'], mapping['operation'], mapping['filename'])
+        )
         
         self.data_flow_graph = G
         return G
     
-    def visualize_data_flow(self) -> None:
-        """Create a visualization of the data flow graph"""
+    def visualize_data_flow(self) -> Optional[str]:
+        """Create a Graphviz DOT visualization of the data flow graph, laid out by the browser"""
         G = self.data_flow_graph
         
         if not G.nodes():
             return None
-            
-        plt.figure(figsize=(12, 8))
-        pos = nx.spring_layout(G, seed=42)
         
         # Draw different node types with different colors
         node_colors = {
@@ -351,59 +211,286 @@ class DataFlowAnalyzer:
             'transformation': 'purple'
         }
         
-        for node_type, color in node_colors.items():
-            nodes = [n for n, d in G.nodes(data=True) if d.get('type') == node_type]
-            if nodes:
-                nx.draw_networkx_nodes(G, pos, nodelist=nodes, node_color=color, node_size=300, alpha=0.8, label=node_type)
+        lines = [
+            'digraph "Data Flow Graph" {',
+            '  label="Data Flow Graph"; labelloc=t; rankdir=LR;',
+            '  node [shape=ellipse, style=filled, fillcolor=white, fontsize=10];',
+            '  edge [fontsize=8];'
+        ]
+        for node, data in G.nodes(data=True):
+            node = str(node)
+            # Truncate long node names
+            label = f"{node[:17]}..." if len(node) > 20 else node
+            color = node_colors.get(data.get('type'), 'white')
+            lines.append(f'  {_dot_quote(node)} [label={_dot_quote(label)}, tooltip={_dot_quote(node)}, fillcolor="{color}"];')
         
         # Draw edges with labels for operations
-        edge_labels = {(u, v): d['operation'] for u, v, d in G.edges(data=True)}
-        nx.draw_networkx_edges(G, pos, width=1.0, alpha=0.5, arrowsize=20)
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_size=8)
-        
-        # Draw node labels
-        node_labels = {}
-        for node in G.nodes():
-            if isinstance(node, str) and len(node) > 20:
-                # Truncate long node names
-                node_labels[node] = f"{node[:17]}..."
-            else:
-                node_labels[node] = node
-                
-        nx.draw_networkx_labels(G, pos, labels=node_labels, font_size=10)
-        
-        plt.title("Data Flow Graph")
-        plt.legend()
-        plt.axis('off')
-        return plt
+        for u, v, data in G.edges(data=True):
+            lines.append(f'  {_dot_quote(str(u))} -> {_dot_quote(str(v))} [label={_dot_quote(str(data["operation"]))}];')
+        lines.append('}')
+        return "\n".join(lines)
+
+def _dot_quote(text: str) -> str:
+    """Quote a string as a Graphviz DOT identifier"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+# ----------------------------- ANALYSIS CACHE -----------------------------
+
+# Bump when DataFlowAnalyzer.scan_script changes what it extracts or how results are stored,
+# so stale entries are never reused
+ANALYSIS_CACHE_VERSION = "2"
+ANALYSIS_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".scanner_cache.db")
+# Fewer uncached scripts than this are scanned in-process, where pool startup would dominate
+PARALLEL_SCAN_MIN_FILES = 8
+
+def _open_analysis_cache() -> sqlite3.Connection:
+    """Open the on-disk scan and explanation cache, creating its tables if needed"""
+    conn = sqlite3.connect(ANALYSIS_CACHE_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS analyses (key TEXT PRIMARY KEY, results BLOB NOT NULL)")
+    conn.execute("CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT NOT NULL)")
+    return conn
+
+def _load_cached_analysis(key: str) -> Optional[Dict]:
+    """Return the stored scan results for a cache key, or None on a miss"""
+    try:
+        with closing(_open_analysis_cache()) as conn:
+            row = conn.execute("SELECT results FROM analyses WHERE key = ?", (key,)).fetchone()
+        return orjson.loads(row[0]) if row is not None else None
+    except (sqlite3.Error, ValueError, TypeError):
+        # Unreadable or corrupt entries are treated as misses and overwritten
+        return None
+
+def _store_cached_analyses(results_by_key: Dict[str, Dict]) -> None:
+    """Store scan results under their cache keys over one connection; the cache is best effort"""
+    try:
+        with closing(_open_analysis_cache()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO analyses (key, results) VALUES (?, ?)",
+                [(key, orjson.dumps(results)) for key, results in results_by_key.items()]
+            )
+    except (sqlite3.Error, TypeError):
+        pass
+
+def _analysis_cache_key(script: str) -> str:
+    """Key of a script's scan results in the on-disk cache"""
+    return hashlib.sha256(f"{ANALYSIS_CACHE_VERSION}:{script}".encode("utf-8")).hexdigest()
+
+def _cached_analysis_keys(keys: Iterable[str]) -> Set[str]:
+    """Return which of the cache keys have scan results stored, checked over one connection"""
+    try:
+        with closing(_open_analysis_cache()) as conn:
+            return {key for key in keys if conn.execute("SELECT 1 FROM analyses WHERE key = ?", (key,)).fetchone() is not None}
+    except sqlite3.Error:
+        return set()
+
+@st.cache_data(show_spinner=False)
+def analyze_script(script: str) -> Dict:
+    """Scan a script, reusing results stored for identical content in this or earlier sessions"""
+    key = _analysis_cache_key(script)
+    results = _load_cached_analysis(key)
+    if results is None:
+        results = scan_script(script)
+        _store_cached_analyses({key: results})
+    return results
+
+def prescan_scripts(scripts: List[str]) -> None:
+    """Scan scripts missing from the on-disk cache in worker processes, so analyze_script finds them stored"""
+    scripts_by_key = {_analysis_cache_key(script): script for script in scripts}
+    cached = _cached_analysis_keys(scripts_by_key)
+    missing = {key: script for key, script in scripts_by_key.items() if key not in cached}
+    if len(missing) < PARALLEL_SCAN_MIN_FILES:
+        return
+    scanned = {}
+    with ProcessPoolExecutor() as executor:
+        futures = {executor.submit(scan_script, script): key for key, script in missing.items()}
+        for future in as_completed(futures):
+            # Scripts that fail to parse are reported when they are analyzed
+            if future.exception() is None:
+                scanned[futures[future]] = future.result()
+    _store_cached_analyses(scanned)
+
+@st.cache_data(max_entries=4096, show_spinner=False)
+def parse_sql_query(query: str) -> Dict:
+    """Parse a SQL query once per distinct text across reruns and sessions"""
+    return DataFlowAnalyzer.parse_sql(query)
 
 # ----------------------------- LLM UTILS ----------------------------------
 
+SUMMARY_MODEL = "gpt-4o"
+# Items explained per chat completion, and chat completions in flight at once
+SUMMARY_BATCH_SIZE = 20
+SUMMARY_MAX_WORKERS = 8
+# Explanations kept in memory across reruns and sessions
+SUMMARY_MEMO_SIZE = 1024
+
+SUMMARY_PROMPTS = {
+    "sql": "Explain this SQL logic in simple terms for business understanding",
+    "transformation": "Explain this data transformation in simple terms for business understanding",
+    "business_rule": "Explain this business rule in simple terms for non-technical stakeholders",
+}
+SUMMARY_BATCH_PROMPTS = {
+    "sql": "Explain each of these SQL queries in simple terms for business understanding",
+    "transformation": "Explain each of these data transformations in simple terms for business understanding",
+    "business_rule": "Explain each of these business rules in simple terms for non-technical stakeholders",
+}
+SUMMARY_SYSTEM_MESSAGE = {"role": "system", "content": "You are a data analyst helping to understand code logic."}
+
+def _request_summary(text: str, content_type: str) -> str:
+    """Ask GPT to explain a single item"""
+    prompt = SUMMARY_PROMPTS.get(content_type, "Explain this code logic in simple terms for business understanding")
+    response = openai.ChatCompletion.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            SUMMARY_SYSTEM_MESSAGE,
+            {"role": "user", "content": f"{prompt}: {text}"}
+        ]
+    )
+    return response['choices'][0]['message']['content']
+
+def _request_batch_summaries(texts: List[str], content_type: str) -> List[str]:
+    """Ask GPT to explain several items in one chat completion"""
+    prompt = SUMMARY_BATCH_PROMPTS.get(content_type, "Explain each of these pieces of code logic in simple terms for business understanding")
+    items = "\n\n".join(f"Item {i}:\n{text}" for i, text in enumerate(texts, 1))
+    response = openai.ChatCompletion.create(
+        model=SUMMARY_MODEL,
+        response_format={"type": "json_object"},
+        messages=[
+            SUMMARY_SYSTEM_MESSAGE,
+            {"role": "user", "content": (
+                f"{prompt}. Reply with a JSON object whose \"explanations\" key is an array of "
+                f"{len(texts)} strings, one explanation per item, in item order.\n\n{items}"
+            )}
+        ]
+    )
+    summaries = orjson.loads(response['choices'][0]['message']['content']).get("explanations")
+    if not isinstance(summaries, list) or len(summaries) != len(texts) or not all(isinstance(s, str) for s in summaries):
+        raise ValueError("batched reply does not match the requested items")
+    return summaries
+
+def _summarize_chunk(texts: List[str], content_type: str) -> List[Tuple[str, bool]]:
+    """Explain a chunk of items, falling back to one request per item; the flag marks successful explanations"""
+    if len(texts) > 1:
+        try:
+            return [(summary, True) for summary in _request_batch_summaries(texts, content_type)]
+        except Exception:
+            pass
+    results = []
+    for text in texts:
+        try:
+            results.append((_request_summary(text, content_type), True))
+        except Exception as e:
+            results.append((f"Error from LLM: {str(e)}", False))
+    return results
+
+@st.cache_resource
+def _summary_memo() -> Tuple[Dict[Tuple[str, str], str], threading.Lock]:
+    """Explanations shared by every rerun and session, keyed by (text, content type), and the lock guarding them"""
+    return {}, threading.Lock()
+
+def _summary_cache_key(text: str, content_type: str) -> str:
+    """Key of an explanation in the on-disk cache"""
+    return hashlib.sha256(f"{SUMMARY_MODEL}:{content_type}:{text}".encode("utf-8")).hexdigest()
+
+def _load_cached_summaries(items: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+    """Return the explanations stored for (text, content type) items in this or earlier sessions"""
+    found = {}
+    try:
+        with closing(_open_analysis_cache()) as conn:
+            for item in items:
+                row = conn.execute("SELECT summary FROM summaries WHERE key = ?", (_summary_cache_key(*item),)).fetchone()
+                if row is not None:
+                    found[item] = row[0]
+    except sqlite3.Error:
+        pass
+    return found
+
+def _store_cached_summaries(summaries: Dict[Tuple[str, str], str]) -> None:
+    """Store explanations keyed by (text, content type); the cache is best effort"""
+    try:
+        with closing(_open_analysis_cache()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)",
+                [(_summary_cache_key(*item), summary) for item, summary in summaries.items()]
+            )
+    except sqlite3.Error:
+        pass
+
 def gpt_summarize_logic(text: str, content_type: str = "sql") -> str:
     """Use GPT to summarize code logic"""
-    try:
-        if content_type == "sql":
-            prompt = f"Explain this SQL logic in simple terms for business understanding: {text}"
-        elif content_type == "transformation":
-            prompt = f"Explain this data transformation in simple terms for business understanding: {text}"
-        elif content_type == "business_rule":
-            prompt = f"Explain this business rule in simple terms for non-technical stakeholders: {text}"
-        else:
-            prompt = f"Explain this code logic in simple terms for business understanding: {text}"
-            
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a data analyst helping to understand code logic."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        return response['choices'][0]['message']['content']
-    except Exception as e:
-        return f"Error from LLM: {str(e)}"
+    return summarize_all([(text, content_type)])[(text, content_type)]
+
+def _merge_into_memo(memo: Dict[Tuple[str, str], str], summaries: Dict[Tuple[str, str], str]) -> None:
+    """Add explanations to the shared memo, dropping the oldest beyond SUMMARY_MEMO_SIZE; the caller holds its lock"""
+    memo.update(summaries)
+    while len(memo) > SUMMARY_MEMO_SIZE:
+        memo.pop(next(iter(memo)))
+
+def summarize_all(items: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+    """Use GPT to summarize many (text, content type) items, batching them into concurrent requests"""
+    items = list(items)
+    # Sessions run on separate threads, so every access to the shared memo holds its lock
+    memo, memo_lock = _summary_memo()
+    with memo_lock:
+        results = {item: memo[item] for item in items if item in memo}
+    stored = _load_cached_summaries(item for item in dict.fromkeys(items) if item not in results)
+    results.update(stored)
+    with memo_lock:
+        _merge_into_memo(memo, stored)
+
+    by_type = {}
+    for text, content_type in dict.fromkeys(item for item in items if item not in results):
+        by_type.setdefault(content_type, []).append(text)
+    chunks = [
+        (texts[start:start + SUMMARY_BATCH_SIZE], content_type)
+        for content_type, texts in by_type.items()
+        for start in range(0, len(texts), SUMMARY_BATCH_SIZE)
+    ]
+    if chunks:
+        fresh = {}
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_MAX_WORKERS, len(chunks))) as executor:
+            futures = [executor.submit(_summarize_chunk, texts, content_type) for texts, content_type in chunks]
+            for (texts, content_type), future in zip(chunks, futures):
+                for text, (summary, ok) in zip(texts, future.result()):
+                    results[(text, content_type)] = summary
+                    # Failed requests are retried on the next rerun
+                    if ok:
+                        fresh[(text, content_type)] = summary
+        _store_cached_summaries(fresh)
+        with memo_lock:
+            _merge_into_memo(memo, fresh)
+    return results
 
 # ---------------------------- STREAMLIT UI --------------------------------
 
+# Rows sent to the browser per results table; the Excel export always has every row
+MAX_TABLE_ROWS = 1000
+
+def show_table(df: pd.DataFrame) -> None:
+    """Display at most MAX_TABLE_ROWS rows of a table, noting when it was cut short"""
+    st.dataframe(df.head(MAX_TABLE_ROWS), use_container_width=True)
+    if len(df) > MAX_TABLE_ROWS:
+        st.caption(f"Showing the first {MAX_TABLE_ROWS} of {len(df)} rows. Download the Excel output for all rows.")
+
+# Items rendered per page in the SQL, transformation and business rule tabs
+ITEMS_PER_PAGE = 50
+
+def page_of(items: List, key: str) -> List:
+    """Return the page of items picked with a page selector, shown only when there is more than one page"""
+    pages = (len(items) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+    if pages <= 1:
+        return items
+    # The page count is part of the key, so a remembered page is always in range
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, key=f"{key}_{pages}")
+    return items[(page - 1) * ITEMS_PER_PAGE:page * ITEMS_PER_PAGE]
+
+def upload_digest(uploaded_file) -> str:
+    """Return the sha256 of an uploaded file, hashing its content once per upload rather than on every rerun"""
+    digest = st.session_state.get("upload_digest")
+    if digest is None or digest[0] != uploaded_file.file_id:
+        digest = (uploaded_file.file_id, hashlib.sha256(uploaded_file.getbuffer()).hexdigest())
+        st.session_state["upload_digest"] = digest
+    return digest[1]
+
 st.set_page_config(layout="wide")
 st.title("Enhanced Universal Scanner")
 st.write("Upload Python/PySpark scripts to analyze and extract data lineage, transformations, and business logic.")
@@ -411,59 +498,90 @@ st.write("Upload Python/PySpark scripts to analyze and extract data lineage, tra
 upload_type = st.radio("Upload Type", ["Single File", "Multiple Files/Folder (ZIP)"])
 
 analyzer = DataFlowAnalyzer()
+# Identifies the uploaded content; reruns with the same upload reuse the analyzer kept in the session
+upload_signature = None
 
 if upload_type == "Single File":
     uploaded_file = st.file_uploader("Choose your Python/PySpark script", type=["py"])
     
     if uploaded_file:
-        script_text = uploaded_file.read().decode("utf-8")
         filename = uploaded_file.name
+        upload_signature = (filename, upload_digest(uploaded_file))
         
-        with st.spinner("Analyzing script..."):
-            result = analyzer.extract_python_entities(script_text, filename)
+        if st.session_state.get("upload_signature") == upload_signature:
+            analyzer = st.session_state["analyzer"]
             st.success(f"Analyzed {filename}")
+        else:
+            with st.spinner("Analyzing script..."):
+                # utf-8-sig drops the byte order mark some editors write, which ast.parse rejects
+                result = analyzer.extract_python_entities(uploaded_file.getvalue().decode("utf-8-sig"), filename)
+                st.success(f"Analyzed {filename}")
 else:
     uploaded_zip = st.file_uploader("Upload ZIP file containing Python scripts", type=["zip"])
     
     if uploaded_zip:
-        with st.spinner("Extracting and analyzing scripts..."):
-            # Create a temporary directory to extract files
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Save the uploaded zip file
-                zip_path = os.path.join(temp_dir, "uploaded.zip")
-                with open(zip_path, "wb") as f:
-                    f.write(uploaded_zip.getbuffer())
-                
-                # Extract the zip file
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(temp_dir)
-                
-                # Find all Python files
-                python_files = []
-                for root, _, files in os.walk(temp_dir):
-                    for file in files:
-                        if file.endswith(".py"):
-                            python_files.append(os.path.join(root, file))
+        upload_signature = ("zip", upload_digest(uploaded_zip))
+        
+        if st.session_state.get("upload_signature") == upload_signature:
+            analyzer = st.session_state["analyzer"]
+            for error in st.session_state["upload_errors"]:
+                st.error(error)
+            st.success(f"Analyzed {st.session_state['upload_file_count']} Python files")
+        else:
+            upload_errors = []
+            with st.spinner("Extracting and analyzing scripts..."):
+                # Read Python files straight from the archive instead of extracting it to disk
+                with zipfile.ZipFile(uploaded_zip) as zip_ref:
+                    python_files = [
+                        info.filename for info in zip_ref.infolist()
+                        if not info.is_dir() and info.filename.endswith(".py")
+                        and not SKIPPED_ARCHIVE_DIRS.intersection(info.filename.split("/")[:-1])
+                    ]
+                    
+                    scripts = {}
+                    for rel_path in python_files:
+                        try:
+                            with io.TextIOWrapper(zip_ref.open(rel_path), encoding="utf-8-sig") as f:
+                                scripts[rel_path] = f.read()
+                        except Exception as e:
+                            upload_errors.append(f"Error analyzing {rel_path}: {str(e)}")
                 
-                # Analyze each Python file
-                for file_path in python_files:
+                # Parse new scripts in parallel, then merge every file's results in archive order
+                prescan_scripts(list(scripts.values()))
+                for rel_path, script_text in scripts.items():
                     try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            script_text = f.read()
-                        
-                        # Get the relative path
-                        rel_path = os.path.relpath(file_path, temp_dir)
                         analyzer.extract_python_entities(script_text, rel_path)
                         
                     except Exception as e:
-                        st.error(f"Error analyzing {file_path}: {str(e)}")
+                        upload_errors.append(f"Error analyzing {rel_path}: {str(e)}")
                 
+                for error in upload_errors:
+                    st.error(error)
                 st.success(f"Analyzed {len(python_files)} Python files")
+            
+            st.session_state["upload_errors"] = upload_errors
+            st.session_state["upload_file_count"] = len(python_files)
 
 # Display results if we have analyzed any scripts
 if analyzer.script_mapping:
-    analyzer.analyze_all_sql_queries()
-    analyzer.build_data_flow_graph()
+    # SQL lineage and the graph are derived once per upload, then kept with the analyzer
+    if st.session_state.get("upload_signature") != upload_signature:
+        analyzer.analyze_all_sql_queries()
+        analyzer.build_data_flow_graph()
+        st.session_state["analyzer"] = analyzer
+        st.session_state["upload_signature"] = upload_signature
+
+    # Request every business explanation up front so they are batched and sent concurrently
+    sql_queries = [query for query in analyzer.all_entities["sql_queries"] if query.strip()]
+    summary_items = [(query, "sql") for query in sql_queries]
+    summary_items += [(transform.get('details', ''), "transformation") for transform in analyzer.all_entities["transformations"]]
+    summary_items += [
+        (rule.get('condition', rule.get('full_call', '')), "business_rule")
+        for entities in analyzer.script_mapping.values()
+        for rule in entities.get("business_rules", [])
+    ]
+    with st.spinner("Generating business explanations..."):
+        summaries = summarize_all(summary_items)
     
     # Set up tabs for different views
     tabs = st.tabs(["Overview", "Variable Tracking", "SQL Analysis", "Transformations", "Business Rules", "Data Flow"])
@@ -474,157 +592,137 @@ if analyzer.script_mapping:
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Files Analyzed")
-            for filename in analyzer.script_mapping.keys():
-                st.write(f"• {filename}")
+            # One markdown element per block instead of one per line
+            st.markdown("  \n".join(f"• {filename}" for filename in analyzer.script_mapping))
         
         with col2:
             st.subheader("Metrics")
-            st.write(f"Functions: {len(analyzer.all_entities['functions'])}")
-            st.write(f"Variables: {len(analyzer.all_entities['variables'])}")
-            st.write(f"File Paths: {len(analyzer.all_entities['file_paths'])}")
-            st.write(f"SQL Queries: {len(analyzer.all_entities['sql_queries'])}")
-            st.write(f"Transformations: {len(analyzer.all_entities['transformations'])}")
+            st.markdown("  \n".join([
+                f"Functions: {len(analyzer.all_entities['functions'])}",
+                f"Variables: {len(analyzer.all_entities['variables'])}",
+                f"File Paths: {len(analyzer.all_entities['file_paths'])}",
+                f"SQL Queries: {len(analyzer.all_entities['sql_queries'])}",
+                f"Transformations: {len(analyzer.all_entities['transformations'])}"
+            ]))
     
     with tabs[1]:
         st.header("Variable Tracking")
         
-        # Create a dataframe of all variables
-        var_data = []
-        for filename, entities in analyzer.script_mapping.items():
-            for var in entities["variables"]:
-                var_data.append({
-                    "Filename": filename,
-                    "Variable Name": var,
-                    "Type": "DataFrame" if f"{filename}:{var}" in analyzer.all_entities["dataframes"] else "Regular"
-                })
-        
-        df_vars = pd.DataFrame(var_data)
-        st.dataframe(df_vars)
+        # Create a dataframe of all variables, one row tuple per variable
+        all_dataframes = analyzer.all_entities["dataframes"]
+        df_vars = pd.DataFrame(
+            [
+                (filename, var, "DataFrame" if f"{filename}:{var}" in all_dataframes else "Regular")
+                for filename, entities in analyzer.script_mapping.items()
+                for var in entities["variables"]
+            ],
+            columns=["Filename", "Variable Name", "Type"]
+        )
+        show_table(df_vars)
         
         # Show dataframes specifically
         st.subheader("DataFrames")
-        df_data = []
-        for df_key, df_info in analyzer.all_entities["dataframes"].items():
-            filename, df_name = df_key.split(":", 1)
-            df_data.append({
-                "Filename": filename,
-                "DataFrame": df_name,
-                "Type": df_info['type'],
-                "Source/Method": df_info.get('source', '') + ' / ' + df_info.get('method', '')
-            })
-        
-        df_dataframes = pd.DataFrame(df_data)
-        st.dataframe(df_dataframes)
+        df_dataframes = pd.DataFrame(
+            [
+                (*df_key.split(":", 1), df_info['type'], df_info.get('source', '') + ' / ' + df_info.get('method', ''))
+                for df_key, df_info in all_dataframes.items()
+            ],
+            columns=["Filename", "DataFrame", "Type", "Source/Method"]
+        )
+        show_table(df_dataframes)
     
     with tabs[2]:
         st.header("SQL Analysis")
         
-        for i, query in enumerate(analyzer.all_entities["sql_queries"]):
-            if query.strip():
-                st.subheader(f"SQL Query {i+1}")
-                
-                col1, col2 = st.columns([2, 1])
-                
-                with col1:
-                    st.code(query, language="sql")
-                    
-                    # Show tables used
-                    sql_analysis = analyzer.parse_sql_tables_and_transformations(query)
-                    if sql_analysis["tables"]:
-                        st.write("Tables referenced:")
-                        for table in sql_analysis["tables"]:
-                            st.write(f"• {table}")
+        # Each item is several elements, so long lists are sent a page at a time
+        numbered_queries = [(i, query) for i, query in enumerate(analyzer.all_entities["sql_queries"]) if query.strip()]
+        for i, query in page_of(numbered_queries, "sql_page"):
+            st.subheader(f"SQL Query {i+1}")
+            
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                st.code(query, language="sql")
                 
-                with col2:
-                    # Get LLM explanation of the SQL
-                    explanation = gpt_summarize_logic(query, "sql")
-                    st.write("**Business Explanation:**")
-                    st.write(explanation)
+                # Show tables used
+                sql_analysis = analyzer.parse_sql_tables_and_transformations(query)
+                if sql_analysis["tables"]:
+                    st.markdown("  \n".join(["Tables referenced:"] + [f"• {table}" for table in sql_analysis["tables"]]))
+            
+            with col2:
+                # Get LLM explanation of the SQL
+                explanation = summaries[(query, "sql")]
+                st.markdown(f"**Business Explanation:**\n\n{explanation}")
     
     with tabs[3]:
         st.header("Data Transformations")
         
-        for i, transform in enumerate(analyzer.all_entities["transformations"]):
+        for i, transform in page_of(list(enumerate(analyzer.all_entities["transformations"])), "transformation_page"):
             st.subheader(f"Transformation {i+1}")
             
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                st.write(f"**Source:** {transform.get('source')}")
-                st.write(f"**Target:** {transform.get('target')}")
-                st.write(f"**Operation:** {transform.get('operation')}")
-                st.write(f"**In function:** {transform.get('in_function', 'N/A')}")
+                st.markdown("  \n".join([
+                    f"**Source:** {transform.get('source')}",
+                    f"**Target:** {transform.get('target')}",
+                    f"**Operation:** {transform.get('operation')}",
+                    f"**In function:** {transform.get('in_function', 'N/A')}"
+                ]))
                 st.code(transform.get('details', ''), language="python")
             
             with col2:
                 # Get LLM explanation of the transformation
-                explanation = gpt_summarize_logic(transform.get('details', ''), "transformation")
-                st.write("**Business Explanation:**")
-                st.write(explanation)
+                explanation = summaries[(transform.get('details', ''), "transformation")]
+                st.markdown(f"**Business Explanation:**\n\n{explanation}")
     
     with tabs[4]:
         st.header("Business Rules")
         
-        for filename, entities in analyzer.script_mapping.items():
-            if entities.get("business_rules"):
+        numbered_rules = [
+            (filename, i, rule)
+            for filename, entities in analyzer.script_mapping.items()
+            for i, rule in enumerate(entities.get("business_rules", []))
+        ]
+        shown_filename = None
+        for filename, i, rule in page_of(numbered_rules, "rule_page"):
+            if filename != shown_filename:
                 st.subheader(f"Rules in {filename}")
-                
-                for i, rule in enumerate(entities["business_rules"]):
-                    st.write(f"**Rule {i+1}:** {rule['type']}")
-                    
-                    if rule['type'] == 'condition':
-                        st.code(f"IF {rule['condition']}:", language="python")
-                        for action in rule['actions']:
-                            st.code(f"  {action}", language="python")
-                    else:
-                        st.code(rule['full_call'], language="python")
-                    
-                    # Get LLM explanation of the rule
-                    rule_text = rule.get('condition', rule.get('full_call', ''))
-                    explanation = gpt_summarize_logic(rule_text, "business_rule")
-                    st.write("**Business Explanation:**")
-                    st.write(explanation)
+                shown_filename = filename
+            
+            st.write(f"**Rule {i+1}:** {rule['type']}")
+            
+            if rule['type'] == 'condition':
+                st.code("\n".join([f"IF {rule['condition']}:"] + [f"  {action}" for action in rule['actions']]), language="python")
+            else:
+                st.code(rule['full_call'], language="python")
+            
+            # Get LLM explanation of the rule
+            rule_text = rule.get('condition', rule.get('full_call', ''))
+            explanation = summaries[(rule_text, "business_rule")]
+            st.markdown(f"**Business Explanation:**\n\n{explanation}")
     
     with tabs[5]:
         st.header("Data Flow Visualization")
         
         # Generate and display the data flow graph
-        plt_fig = analyzer.visualize_data_flow()
-        if plt_fig:
-            st.pyplot(plt_fig.figure)
+        data_flow_dot = analyzer.visualize_data_flow()
+        if data_flow_dot:
+            st.graphviz_chart(data_flow_dot)
         
         # Display source-target mapping table
         st.subheader("Source-Target Mapping")
         df_mapping = pd.DataFrame(analyzer.all_entities["source_target_mapping"])
-        st.dataframe(df_mapping)
+        show_table(df_mapping)
 
     # Export section
     st.header("📥 Download Results")
     
-    # Create export data
-    export_data = {
-        "Overview": pd.DataFrame({
-            "Metric": ["Files", "Functions", "Variables", "File Paths", "SQL Queries", "Transformations"],
-            "Count": [
-                len(analyzer.script_mapping),
-                len(analyzer.all_entities['functions']),
-                len(analyzer.all_entities['variables']),
-                len(analyzer.all_entities['file_paths']),
-                len(analyzer.all_entities['sql_queries']),
-                len(analyzer.all_entities['transformations'])
-            ]
-        }),
-        "Variables": df_vars if 'df_vars' in locals() else pd.DataFrame(),
-        "DataFrames": df_dataframes if 'df_dataframes' in locals() else pd.DataFrame(),
-        "Transformations": pd.DataFrame(analyzer.all_entities["transformations"]),
-        "Source_Target": pd.DataFrame(analyzer.all_entities["source_target_mapping"])
-    }
-    
     # Create SQL explanation sheet
     sql_explanations = []
     for i, query in enumerate(analyzer.all_entities["sql_queries"]):
         if query.strip():
-            explanation = gpt_summarize_logic(query, "sql")
+            explanation = summaries[(query, "sql")]
             sql_analysis = analyzer.parse_sql_tables_and_transformations(query)
             
             sql_explanations.append({
@@ -634,12 +732,44 @@ if analyzer.script_mapping:
                 "Business_Explanation": explanation
             })
     
-    export_data["SQL_Analysis"] = pd.DataFrame(sql_explanations)
-    
-    # Write to Excel
-    with pd.ExcelWriter("enhanced_scanner_output.xlsx") as writer:
-        for sheet_name, df in export_data.items():
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    # The workbook only changes with the upload or a retried explanation, so reruns such as
+    # paging reuse the bytes kept in the session instead of writing it again
+    export_signature = (upload_signature, tuple(row["Business_Explanation"] for row in sql_explanations))
+    if st.session_state.get("export_signature") != export_signature:
+        # Create export data
+        export_data = {
+            "Overview": pd.DataFrame({
+                "Metric": ["Files", "Functions", "Variables", "File Paths", "SQL Queries", "Transformations"],
+                "Count": [
+                    len(analyzer.script_mapping),
+                    len(analyzer.all_entities['functions']),
+                    len(analyzer.all_entities['variables']),
+                    len(analyzer.all_entities['file_paths']),
+                    len(analyzer.all_entities['sql_queries']),
+                    len(analyzer.all_entities['transformations'])
+                ]
+            }),
+            "Variables": df_vars if 'df_vars' in locals() else pd.DataFrame(),
+            "DataFrames": df_dataframes if 'df_dataframes' in locals() else pd.DataFrame(),
+            "Transformations": pd.DataFrame(analyzer.all_entities["transformations"]),
+            "Source_Target": pd.DataFrame(analyzer.all_entities["source_target_mapping"]),
+            "SQL_Analysis": pd.DataFrame(sql_explanations)
+        }
+        
+        # Write to Excel in memory rather than through a file on disk
+        excel_buffer = io.BytesIO()
+        with pd.ExcelWriter(excel_buffer) as writer:
+            for sheet_name, df in export_data.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        
+        st.session_state["export_bytes"] = excel_buffer.getvalue()
+        st.session_state["export_signature"] = export_signature
     
-    with open("enhanced_scanner_output.xlsx", "rb") as f:
-        st.download_button("Download Excel Output", data=f, file_name="enhanced_scanner_output.xlsx")
\ No newline at end of file
+    # Downloading does not change any results, so skip the rerun that would re-render every tab
+    st.download_button(
+        "Download Excel Output",
+        data=st.session_state["export_bytes"],
+        file_name="enhanced_scanner_output.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        on_click="ignore"
+    )
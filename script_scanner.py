@@ -0,0 +1,182 @@
+"""
+Filename-independent entity extraction for Python scripts.
+
+Kept apart from the Streamlit app so that worker processes can import it.
+"""
+
+import ast
+import functools
+import re
+from collections import deque
+from typing import Dict
+
+# DataFrame methods treated as transformations at any level, and the subset reported per function
+DF_METHODS = frozenset(['groupby', 'filter', 'sort_values', 'merge', 'join', 'concat', 'apply', 'map', 'pivot', 'melt'])
+FUNCTION_DF_METHODS = frozenset(['groupby', 'filter', 'sort_values', 'merge', 'join', 'concat', 'apply'])
+# Substrings of an upper-cased string constant that mark it as SQL or as a configuration value.
+# 'DELETE FROM' is covered by 'FROM'.
+SQL_KEYWORDS = ('SELECT', 'FROM', 'WHERE', 'JOIN', 'GROUP BY', 'ORDER BY', 'CREATE TABLE', 'INSERT INTO', 'UPDATE')
+CONFIG_KEYWORDS = ('TABLE', 'CONFIG', 'PARAM', 'SETTING')
+# Method name fragments that suggest business logic
+RULE_KEYWORDS = ('validate', 'check', 'enforce', 'calculate', 'compute', 'apply_rule')
+# Method names are short, so one regex search beats a generator of substring checks
+_RULE_RE = re.compile("|".join(map(re.escape, RULE_KEYWORDS)))
+
+# Nodes that can neither be reported nor contain anything reported: names, constants,
+# contexts and operators. Skipping them keeps the order of everything else unchanged.
+_LEAF_TYPES = frozenset(
+    [ast.Name, ast.Constant, ast.Pass, ast.Break, ast.Continue]
+    + [cls for base in (ast.expr_context, ast.operator, ast.boolop, ast.cmpop, ast.unaryop) for cls in base.__subclasses__()]
+)
+
+
+def scan_script(script: str) -> Dict:
+    """Extract the entities of a Python script that do not depend on its filename"""
+    tree = ast.parse(script)
+    # The same node can be rendered as an assignment, a transformation source and a rule call; render it once
+    unparse = functools.lru_cache(maxsize=None)(ast.unparse)
+    functions, variables, file_paths, configs = set(), set(), set(), set()
+    sql_variables = {}
+    assignments = {}
+    df_transformations = []
+    dataframes = {}
+    business_rules = []
+    # DataFrame operations inside each function, in the order the functions are found
+    function_transformations = []
+    # SQL candidates in source order; variable references are resolved once every assignment is known
+    sql_candidates = []
+
+    # Single breadth-first pass; each node carries the (name, transformations) of its enclosing functions
+    pending = deque([(tree, ())])
+    while pending:
+        node, enclosing = pending.popleft()
+        node_type = type(node)
+
+        if node_type is ast.FunctionDef:
+            functions.add(node.name)
+            in_function = []
+            function_transformations.append(in_function)
+            enclosing = enclosing + ((node.name, in_function),)
+
+        elif node_type is ast.Assign:
+            value = node.value
+            value_type = type(value)
+            targets = [t.id for t in node.targets if type(t) is ast.Name]
+            if targets:
+                # Store the exact assignment logic
+                logic = unparse(value)
+                func = value.func if value_type is ast.Call else None
+                if type(func) is not ast.Attribute:
+                    func = None
+                else:
+                    is_source = hasattr(func.value, 'id') and func.value.id == 'pd' and func.attr.startswith('read_')
+                    is_transformation = func.attr in DF_METHODS
+                    source_df = unparse(func.value) if is_transformation else None
+                for target in targets:
+                    assignments[target] = logic
+                    variables.add(target)
+                    if func is None:
+                        continue
+                    # Check for pd.read_csv, pd.read_excel, etc.
+                    if is_source:
+                        # This is a source dataframe
+                        dataframes[target] = {
+                            'type': 'source',
+                            'method': func.attr,
+                            'source': unparse(value.args[0]) if value.args else 'unknown'
+                        }
+                    # Check for DataFrame transformations
+                    if is_transformation:
+                        df_transformations.append({
+                            'target': target,
+                            'source': source_df,
+                            'operation': func.attr,
+                            'details': logic
+                        })
+                        # Track as a transformation dataframe
+                        dataframes[target] = {
+                            'type': 'transformation',
+                            'method': func.attr,
+                            'source': source_df
+                        }
+                # Data transformations inside function bodies
+                if enclosing and func is not None and func.attr in FUNCTION_DF_METHODS:
+                    for function_name, in_function in enclosing:
+                        for target in targets:
+                            in_function.append({
+                                'target': target,
+                                'source': source_df,
+                                'operation': func.attr,
+                                'details': logic,
+                                'in_function': function_name
+                            })
+
+            # Special handling for file paths, configurations and SQL strings
+            if value_type is ast.Constant and isinstance(value.value, str):
+                val = value.value
+                val_upper = val.upper()
+                if '/' in val or '\\' in val or '.csv' in val or '.xlsx' in val or '.txt' in val:
+                    file_paths.add(val)
+                elif any(keyword in val_upper for keyword in CONFIG_KEYWORDS):
+                    configs.add(val)
+                if targets and any(keyword in val_upper for keyword in SQL_KEYWORDS):
+                    sql_candidates.extend([(target, val) for target in targets])
+
+        # Check for SQL in function calls like spark.sql() or execute_sql()
+        elif node_type is ast.Expr:
+            call = node.value
+            if type(call) is ast.Call and type(call.func) is ast.Attribute and call.func.attr in ('sql', 'execute', 'query') and call.args:
+                arg = call.args[0]
+                arg_type = type(arg)
+                if arg_type is ast.Name:
+                    sql_candidates.append((arg.id, None))
+                elif arg_type is ast.Constant and isinstance(arg.value, str) and is_sql_query(arg.value):
+                    sql_candidates.append((None, arg.value))
+
+        # Extract business rules from if statements
+        elif node_type is ast.If:
+            business_rules.append({
+                'type': 'condition',
+                'condition': unparse(node.test),
+                'actions': [unparse(stmt) for stmt in node.body if type(stmt) is not ast.If]
+            })
+
+        # Extract rules from function calls that suggest business logic
+        elif node_type is ast.Call and type(node.func) is ast.Attribute:
+            if _RULE_RE.search(node.func.attr.lower()):
+                business_rules.append({
+                    'type': 'function_call',
+                    'function': unparse(node.func),
+                    'arguments': [unparse(arg) for arg in node.args],
+                    'full_call': unparse(node)
+                })
+
+        pending.extend([(child, enclosing) for child in ast.iter_child_nodes(node) if type(child) not in _LEAF_TYPES])
+
+    for name, sql in sql_candidates:
+        if name is None:
+            sql_variables[f"inline_sql_{len(sql_variables)}"] = sql
+        elif sql is not None:
+            sql_variables[name] = sql
+        elif name in assignments:
+            sql_variables[name] = assignments[name]
+
+    for in_function in function_transformations:
+        df_transformations.extend(in_function)
+
+    return {
+        "functions": list(functions),
+        "variables": list(variables),
+        "file_paths": list(file_paths),
+        "configs": list(configs),
+        "sql_vars": sql_variables,
+        "df_transformations": df_transformations,
+        "dataframes": dataframes,
+        "business_rules": business_rules
+    }
+
+
+def is_sql_query(text: str) -> bool:
+    """Check if a string is likely to be an SQL query"""
+    text_upper = text.upper()
+    return any(keyword in text_upper for keyword in SQL_KEYWORDS)